@@ -0,0 +1,3 @@
+"""
+效能基準測試
+"""
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""
+解析器效能比較：WebElement 逐格讀取 vs 原始 HTML（lxml / 標準函式庫）
+
+執行方式：python -m benchmarks.bench_parser [--rounds 200] [--webdriver]
+"""
+import argparse
+import glob
+import os
+import time
+
+from src.utils.parser import DataParser
+
+FIXTURE_GLOB = os.path.join('data', 'fixtures', 'ajax_t164sb04', '*.html')
+
+
+def timed(func, rounds):
+    """執行多次並回傳平均毫秒數"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) * 1000 / rounds
+
+
+def bench_html(pages, rounds):
+    """比較原始 HTML 解析後端"""
+    for backend in DataParser.BACKENDS:
+        if backend == 'lxml' and DataParser.DEFAULT_BACKEND != 'lxml':
+            print("lxml 未安裝，略過")
+            continue
+        total = sum(timed(lambda: DataParser.parse_financial_html(html, backend), rounds) for html in pages.values())
+        print(f"{backend:<10} 平均每頁 {total / len(pages):8.3f} ms")
+
+
+def bench_webdriver(paths, rounds):
+    """以瀏覽器載入頁面，比較 WebElement 與 page_source 解析"""
+    from selenium.webdriver.common.by import By
+    from src.utils.driver import WebDriver
+
+    driver = WebDriver.create_driver(headless=True)
+    try:
+        element_total = source_total = 0
+        for path in paths:
+            driver.get('file://' + os.path.abspath(path))
+            table = driver.find_elements(By.CLASS_NAME, "hasBorder")[0]
+            element_total += timed(lambda: DataParser.parse_financial_data(table), rounds)
+            source_total += timed(lambda: DataParser.parse_financial_html(driver.page_source), rounds)
+        print(f"{'element':<10} 平均每頁 {element_total / len(paths):8.3f} ms")
+        print(f"{'source':<10} 平均每頁 {source_total / len(paths):8.3f} ms（含取得 page_source）")
+    finally:
+        driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="解析器效能比較")
+    parser.add_argument('--rounds', type=int, default=200, help="每頁重複次數")
+    parser.add_argument('--webdriver', action='store_true', help="同時測試 WebElement 路徑（需 Chrome）")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(FIXTURE_GLOB))
+    if not paths:
+        print(f"找不到測試頁面: {FIXTURE_GLOB}")
+        return
+    pages = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            pages[path] = f.read()
+
+    print(f"測試頁面 {len(paths)} 個，每頁 {args.rounds} 次")
+    bench_html(pages, args.rounds)
+    if args.webdriver:
+        bench_webdriver(paths, max(1, args.rounds // 20))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+爬取流程效能測試：以本機替身伺服器重播 data/fixtures 的頁面，比較各抓取/解析組合
+
+回報每秒公司數、每家公司延遲 p50/p95 與峰值記憶體（RSS）。各組合在獨立程序中執行，峰值記憶體互不影響。
+搭配 --baseline 可與先前的 --json 結果比較，效能退步超過容許比例，或資料列數、非空欄位數少於基準時
+以結束碼 1 離開（供 CI 使用；變快但少抓資料不算通過）。
+
+執行方式：python -m benchmarks.bench_pipeline [--companies 200] [--latency 0.02] [--json report.json]
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from loguru import logger
+
+from src.utils.fixture_server import FixtureServer
+
+try:
+    import resource
+except ImportError:  # Windows 無 resource 模組，不回報峰值記憶體
+    resource = None
+
+# 測試組合：抓取引擎設定 × 解析後端
+CONFIGS = [
+    {'name': 'http-c1-lxml', 'concurrency': 1, 'backend': 'lxml', 'reports': ['income']},
+    {'name': 'http-c8-lxml', 'concurrency': 8, 'backend': 'lxml', 'reports': ['income']},
+    {'name': 'http-c8-stdlib', 'concurrency': 8, 'backend': 'stdlib', 'reports': ['income']},
+    {'name': 'http-c8-lxml-all', 'concurrency': 8, 'backend': 'lxml',
+     'reports': ['income', 'balance', 'cash_flow']},
+]
+
+
+def peak_rss_mb():
+    """目前程序的峰值 RSS（MB），無法取得時回傳 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 單位為 KB，macOS 為 bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_config(config, base_url, codes, count):
+    """於子程序執行一個組合，回傳測試結果"""
+    from src.crawler import MOPSCrawler
+    from src.models.company import Company
+    from src.utils.parser import DataParser
+    from src.utils.timing import LatencyTracker
+
+    logger.remove()
+    DataParser.DEFAULT_BACKEND = config['backend']
+    companies = [Company(f"公司{i}", codes[i % len(codes)]) for i in range(count)]
+    crawler = MOPSCrawler(
+        engine='http', base_url=base_url, fallback=False,
+        concurrency=config['concurrency'], rate_limit=1e6,
+        companies=companies, reports=config['reports'], save_excel=False
+    )
+
+    # 量測每家公司（含重試）的完整處理時間
+    latencies = LatencyTracker()
+    crawl_company = crawler._crawl_company
+
+    def timed(company, periods=None):
+        with latencies.phase('company'):
+            return crawl_company(company, periods)
+
+    crawler._crawl_company = timed
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        try:
+            records = crawler.run_tasks(crawler.build_tasks(companies, crawler.periods))
+        finally:
+            crawler.close()
+        elapsed = time.perf_counter() - start
+
+    stats = latencies.summary().get('company', {})
+    return {
+        'name': config['name'],
+        'companies': count,
+        'records': len(records),
+        # 非空欄位總數：解析退步（欄位變成空值）時資料列數不變，需另外比較
+        'fields': sum(value is not None for record in records for value in record.to_dict().values()),
+        'seconds': elapsed,
+        'companies_per_sec': count / elapsed if elapsed else 0.0,
+        'p50_ms': stats.get('p50', 0.0) * 1000,
+        'p95_ms': stats.get('p95', 0.0) * 1000,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """與基準比較，回傳退步項目的說明（含效能與資料完整度）"""
+    previous = {item['name']: item for item in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get(result['name'])
+        if not base:
+            continue
+        for key, label in (('records', '資料列數'), ('fields', '非空欄位數')):
+            if key in base and result[key] < base[key]:
+                regressions.append(f"{result['name']}: {label} {base[key]} → {result[key]}")
+        if result['companies_per_sec'] < base['companies_per_sec'] * (1 - tolerance):
+            regressions.append(
+                f"{result['name']}: 每秒公司數 {base['companies_per_sec']:.1f} → {result['companies_per_sec']:.1f}"
+            )
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{result['name']}: p95 {base['p95_ms']:.1f} → {result['p95_ms']:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="爬取流程效能測試")
+    parser.add_argument('--companies', type=int, default=200, help="每個組合處理的公司數")
+    parser.add_argument('--fixture-dir', default='data/fixtures', help="測試頁面目錄")
+    parser.add_argument('--latency', type=float, default=0.02, help="替身伺服器每個請求的延遲（秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="替身伺服器的隨機延遲上限（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="替身伺服器回應 503 的比例")
+    parser.add_argument('--configs', default=None,
+                        help="只執行指定組合（逗號分隔）：" + ', '.join(c['name'] for c in CONFIGS))
+    parser.add_argument('--json', default=None, help="將結果寫入 JSON 檔")
+    parser.add_argument('--baseline', default=None, help="與先前的 JSON 結果比較")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="容許的退步比例")
+    args = parser.parse_args()
+
+    configs = CONFIGS
+    if args.configs:
+        names = {name.strip() for name in args.configs.split(',')}
+        configs = [config for config in CONFIGS if config['name'] in names]
+
+    results = []
+    server = FixtureServer(args.fixture_dir, latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, seed=0)
+    with server:
+        codes = server.codes()
+        if not codes:
+            print(f"找不到測試頁面: {args.fixture_dir}")
+            return 1
+        print(f"測試頁面公司 {len(codes)} 家，每個組合 {args.companies} 家公司，延遲 {args.latency * 1000:.0f} ms")
+        context = multiprocessing.get_context('spawn')
+        for config in configs:
+            # 每個組合使用新的程序，峰值記憶體才不會互相累積
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results.append(pool.submit(run_config, config, server.url, codes, args.companies).result())
+
+    print(f"{'組合':<20}{'公司/秒':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'峰值RSS(MB)':>14}{'資料列':>8}{'非空欄位':>10}")
+    for result in results:
+        rss = f"{result['peak_rss_mb']:.1f}" if result['peak_rss_mb'] is not None else 'n/a'
+        print(f"{result['name']:<20}{result['companies_per_sec']:>10.1f}{result['p50_ms']:>10.1f}"
+              f"{result['p95_ms']:>10.1f}{rss:>14}{result['records']:>8}{result['fields']:>10}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("效能退步：\n" + "\n".join(regressions))
+            return 1
+        print("與基準相比無明顯退步")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+資料列表示方式比較：一般類別（__dict__）vs __slots__ Company vs 欄式 CompanyBatch
+
+比較建立大量資料列的記憶體用量，以及轉為 DataFrame / Arrow 的時間。
+執行方式：python -m benchmarks.bench_records [--rows 50000] [--rounds 5]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import pandas as pd
+
+from src.models.company import Company
+from src.models.company_batch import CompanyBatch, FIELDS
+
+
+class DictCompany:
+    """加入 __slots__ 前的 Company（每筆資料帶有 __dict__），作為比較基準"""
+    def __init__(self, name=None, code=None):
+        self.name = name
+        self.code = code
+        self.industry = None
+        self.year = None
+        self.season = None
+        self.annual_revenue = None
+        self.gross_profit = None
+        self.gross_margin = None
+        self.profit_before_tax = None
+        self.profit_after_tax = None
+
+    def to_dict(self):
+        return {label: getattr(self, attr) for attr, label in FIELDS.items()}
+
+
+def make_rows(cls, count):
+    """產生 count 筆測試資料（約 1/10 的金額為缺值）"""
+    rows = []
+    for i in range(count):
+        company = cls(f"公司{i % 2000}", str(1000 + i % 2000))
+        company.industry = '半導體業'
+        company.year = str(100 + i // 8000)
+        company.season = f"{i % 4 + 1:02d}"
+        company.annual_revenue = None if i % 10 == 0 else i * 1000
+        company.gross_profit = i * 400
+        company.gross_margin = 40.0 + i % 100 / 10
+        company.profit_before_tax = i * 200
+        company.profit_after_tax = i * 150
+        rows.append(company)
+    return rows
+
+
+def measure_memory(build):
+    """回傳 (結果, 配置的位元組數)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(func, rounds):
+    """執行多次並回傳平均毫秒數"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) * 1000 / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="資料列表示方式比較")
+    parser.add_argument('--rows', type=int, default=50000, help="資料列數")
+    parser.add_argument('--rounds', type=int, default=5, help="轉換時間的重複次數")
+    args = parser.parse_args()
+
+    legacy, legacy_bytes = measure_memory(lambda: make_rows(DictCompany, args.rows))
+    slotted, slotted_bytes = measure_memory(lambda: make_rows(Company, args.rows))
+    batch, batch_bytes = measure_memory(lambda: CompanyBatch.from_companies(make_rows(Company, args.rows)))
+
+    print(f"資料列 {args.rows} 筆")
+    print(f"{'表示方式':<14}{'記憶體(MB)':>12}{'每筆(bytes)':>14}")
+    for name, size in (('__dict__', legacy_bytes), ('__slots__', slotted_bytes), ('CompanyBatch', batch_bytes)):
+        print(f"{name:<14}{size / 1e6:>12.1f}{size / args.rows:>14.0f}")
+
+    print(f"\n{'轉換':<32}{'平均(ms)':>10}")
+    results = [
+        ('__dict__ → DataFrame（to_dict）', timed(lambda: pd.DataFrame([c.to_dict() for c in legacy]), args.rounds)),
+        ('__slots__ → DataFrame（to_dict）', timed(lambda: pd.DataFrame([c.to_dict() for c in slotted]), args.rounds)),
+        ('__slots__ → CompanyBatch', timed(lambda: CompanyBatch.from_companies(slotted), args.rounds)),
+        ('CompanyBatch → DataFrame', timed(batch.to_frame, args.rounds)),
+        ('CompanyBatch → Company 清單', timed(batch.to_companies, args.rounds)),
+    ]
+    try:
+        results.append(('CompanyBatch → Arrow', timed(batch.to_arrow, args.rounds)))
+    except ImportError:
+        print("pyarrow 未安裝，略過 Arrow")
+    for name, ms in results:
+        print(f"{name:<32}{ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
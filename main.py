@@ -1,5 +1,194 @@
+import argparse
+import sys
+
+from loguru import logger
+
 from src.crawler import MOPSCrawler
+from src.parallel_crawler import ShardedCrawler
+from src.utils.cache import ResponseCache
+from src.utils.company_index import CompanyMasterIndex
+from src.utils.company_store import CompanyMetadataStore
+from src.utils.driver import WebDriverPool
+from src.utils.file_handler import FileHandler
+from src.utils.journal import RunJournal
+from src.utils.metrics import CrawlMetrics
+from src.utils.parser import DataParser
+from src.utils.periods import parse_periods
+from src.utils.sinks import CsvSink, MultiSink, ParquetSink
+
+OUTPUT_FORMATS = ('excel', 'parquet', 'csv')
+
+
+def parse_args():
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(description="MOPS 公開資訊觀測站財報爬蟲")
+    parser.add_argument('--input', default='data/input/company_list.xlsx',
+                        help="公司清單（xlsx/csv/parquet，需有「公司代號」欄），逐列串流讀取並去除無效與重複的代號")
+    parser.add_argument('--engine', choices=MOPSCrawler.ENGINES, default='selenium',
+                        help="抓取引擎：selenium（瀏覽器）或 http（直接送出表單）")
+    parser.add_argument('--base-url', default=None,
+                        help="HTTP 引擎的網站根網址（可指向本機替身伺服器）")
+    parser.add_argument('--no-fallback', action='store_true',
+                        help="HTTP 引擎失敗時不改用瀏覽器")
+    parser.add_argument('--parse-mode', choices=MOPSCrawler.PARSE_MODES, default='html',
+                        help="瀏覽器頁面解析方式：html（lxml 解析原始碼）或 element（逐格讀取）")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="HTTP 引擎同時處理的公司數")
+    parser.add_argument('--rate-limit', type=float, default=2.0,
+                        help="每秒對 MOPS 主機的請求上限")
+    parser.add_argument('--cache-path', default='data/cache/responses.sqlite3',
+                        help="原始頁面快取檔案位置")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="停用原始頁面快取")
+    parser.add_argument('--metadata-path', default='data/cache/company_metadata.sqlite3',
+                        help="公司基本資料（名稱、產業類別）快取位置，已知的公司略過搜尋步驟")
+    parser.add_argument('--no-metadata', action='store_true',
+                        help="停用公司基本資料快取，每家公司都重新搜尋")
+    parser.add_argument('--load-master', action='store_true',
+                        help="開始前由上市櫃公司名錄一次匯入所有公司的基本資料")
+    parser.add_argument('--journal-path', default='data/output/journal.jsonl',
+                        help="爬取紀錄檔位置")
+    parser.add_argument('--resume', action='store_true',
+                        help="續跑：略過紀錄檔中已完成的公司，只重試失敗與未處理的公司")
+    parser.add_argument('--incremental', action='store_true',
+                        help="增量更新：依紀錄檔只抓取尚未取得或可能已新公告的期間，輸出仍包含先前的結果")
+    parser.add_argument('--periods', default='113Q4',
+                        help="要抓取的期間，可用逗號分隔或以冒號表示區間，例如 104Q1:113Q4")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="工作程序數；大於 1 時將公司清單分片，由多個程序（各自的瀏覽器）同時爬取")
+    parser.add_argument('--reports', default='income',
+                        help="要抓取的報表，可用逗號組合：income（綜合損益表）、balance（資產負債表）、"
+                             "cash_flow（現金流量表），同一次搜尋後一併抓取並合併為一筆")
+    parser.add_argument('--record-fixtures', default=None, metavar='DIR',
+                        help="HTTP 引擎將實際回應另存為離線測試頁面（例如 data/fixtures）")
+    parser.add_argument('--max-attempts', type=int, default=3,
+                        help="每家公司的嘗試次數上限（只重試限流、網路與瀏覽器錯誤，查無資料不重試）")
+    parser.add_argument('--driver-pool', type=int, default=0, metavar='N',
+                        help="預熱 N 個無頭瀏覽器共用（已停在首頁），重新啟動瀏覽器時直接借用；0 表示不使用連線池")
+    parser.add_argument('--recycle-after', type=int, default=500,
+                        help="瀏覽器每處理幾家公司即重新啟動（0 表示不限）")
+    parser.add_argument('--max-browser-mb', type=int, default=1500,
+                        help="瀏覽器記憶體（RSS）超過此 MB 數時重新啟動（0 表示不限，需安裝 psutil）")
+    parser.add_argument('--quiet', action='store_true',
+                        help="不輸出每家公司的進度文字，只保留 INFO 以上的日誌")
+    parser.add_argument('--metrics-path', default=None,
+                        help="Prometheus 文字格式的統計檔（執行中定期更新），例如 data/output/metrics.prom")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="於此埠號提供 Prometheus /metrics 端點")
+    parser.add_argument('--report-path', default='data/output/run_report.json',
+                        help="執行結束時寫出的 JSON 報告（計數器、延遲統計與每家公司的追蹤 span）")
+    parser.add_argument('--output', default='excel',
+                        help="輸出格式，可用逗號組合：excel（結束時匯出）、parquet、csv（邊爬邊寫）")
+    args = parser.parse_args()
+    args.output = [fmt.strip() for fmt in args.output.split(',') if fmt.strip()]
+    unknown = set(args.output) - set(OUTPUT_FORMATS)
+    if unknown:
+        parser.error(f"不支援的輸出格式: {', '.join(sorted(unknown))}")
+    args.reports = [report.strip() for report in args.reports.split(',') if report.strip()]
+    unknown = set(args.reports) - set(DataParser.REPORTS)
+    if unknown:
+        parser.error(f"不支援的報表: {', '.join(sorted(unknown))}")
+    return args
+
+
+def build_sink(formats, append=False):
+    """依輸出格式建立串流輸出（append=True 時接在先前的輸出之後，否則取代）"""
+    sinks = []
+    if 'parquet' in formats:
+        sinks.append(ParquetSink(append=append))
+    if 'csv' in formats:
+        sinks.append(CsvSink(append=append))
+    return MultiSink(sinks) if sinks else None
+
+
+def finish_metrics(metrics, args):
+    """寫出最終的統計檔與執行報告"""
+    metrics.write_prometheus()
+    if args.report_path:
+        metrics.write_report(args.report_path)
+        logger.info(f"執行報告已保存至: {args.report_path}")
+    metrics.close()
+
 
 if __name__ == "__main__":
-    crawler = MOPSCrawler()
-    crawler.crawl_all_companies() 
\ No newline at end of file
+    args = parse_args()
+    if args.quiet:
+        logger.remove()
+        logger.add(sys.stderr, level='INFO')
+    metrics = CrawlMetrics(prometheus_path=args.metrics_path)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    metadata = None if args.no_metadata else CompanyMetadataStore(args.metadata_path)
+    if metadata is not None and args.load_master:
+        metadata.bulk_load(CompanyMasterIndex.load())
+    if args.workers > 1:
+        # 各工作程序自行開啟同一個檔案
+        if metadata is not None:
+            metadata.close()
+        crawler = ShardedCrawler(
+            workers=args.workers,
+            crawler_kwargs={
+                'engine': args.engine,
+                'base_url': args.base_url,
+                'fallback': not args.no_fallback,
+                'concurrency': args.concurrency,
+                'parse_mode': args.parse_mode,
+                'periods': parse_periods(args.periods),
+                'reports': args.reports,
+                'record_dir': args.record_fixtures,
+                'quiet': args.quiet,
+                'max_attempts': args.max_attempts,
+                'recycle_after': args.recycle_after,
+                'max_browser_mb': args.max_browser_mb,
+            },
+            cache_path=None if args.no_cache else args.cache_path,
+            metadata_path=None if args.no_metadata else args.metadata_path,
+            driver_pool=args.driver_pool,
+            journal=RunJournal(args.journal_path),
+            resume=args.resume,
+            rate_limit=args.rate_limit,
+            sink=build_sink(args.output, append=args.resume or args.incremental),
+            save_excel='excel' in args.output,
+            metrics=metrics,
+            incremental=args.incremental,
+            companies=FileHandler.iter_company_list(args.input)
+        )
+        crawler.crawl_all_companies()
+        finish_metrics(metrics, args)
+        raise SystemExit
+
+    # HTTP 引擎只在備援時才需要瀏覽器，不預先啟動
+    driver_pool = WebDriverPool(
+        args.driver_pool, warm_url=MOPSCrawler.INDEX_URL, prewarm=args.engine == 'selenium'
+    ) if args.driver_pool > 0 else None
+    crawler = MOPSCrawler(
+        engine=args.engine,
+        driver_pool=driver_pool,
+        base_url=args.base_url,
+        fallback=not args.no_fallback,
+        concurrency=args.concurrency,
+        rate_limit=args.rate_limit,
+        parse_mode=args.parse_mode,
+        cache=None if args.no_cache else ResponseCache(args.cache_path),
+        metadata=metadata,
+        journal=RunJournal(args.journal_path),
+        resume=args.resume,
+        periods=parse_periods(args.periods),
+        reports=args.reports,
+        record_dir=args.record_fixtures,
+        sink=build_sink(args.output, append=args.resume or args.incremental),
+        save_excel='excel' in args.output,
+        metrics=metrics,
+        quiet=args.quiet,
+        max_attempts=args.max_attempts,
+        recycle_after=args.recycle_after,
+        max_browser_mb=args.max_browser_mb,
+        incremental=args.incremental,
+        companies=FileHandler.iter_company_list(args.input)
+    )
+    try:
+        crawler.crawl_all_companies()
+    finally:
+        if driver_pool:
+            driver_pool.close()
+    finish_metrics(metrics, args)
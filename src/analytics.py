@@ -0,0 +1,221 @@
+from loguru import logger
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.models.company_batch import CompanyBatch
+from src.utils.file_handler import FileHandler
+from src.utils.normalizer import normalize_frame
+from src.utils.sinks import ParquetSink
+
+KEY_COLUMNS = ['公司代號', '年度', '季別']
+TEXT_COLUMNS = ['公司名稱', '公司代號', '產業類別', '年度', '季別']
+UNKNOWN_INDUSTRY = '未分類'
+
+
+class ResultsAnalytics:
+    """跨公司的彙總與排名：產業統計、百分位排名、多期成長率
+
+    資料以欄式 DataFrame 保存，所有計算都是向量化的 groupby / merge。
+    計算結果會快取，只有 add() 帶入新的資料（新期間或新公司）時才失效。
+    """
+    def __init__(self, frame=None):
+        """frame: 結果 DataFrame（欄位與 results.xlsx 相同，可含額外指標欄）"""
+        self.frame = self._prepare(frame if frame is not None else pd.DataFrame(columns=TEXT_COLUMNS))
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_parquet(cls, root='data/output/parquet'):
+        """由 ParquetSink 的分區資料集載入"""
+        return cls(ParquetSink.read(root).to_pandas())
+
+    @classmethod
+    def from_excel(cls, path='data/output/results.xlsx'):
+        """由結果 Excel 載入"""
+        return cls(FileHandler.read_results(path))
+
+    @classmethod
+    def from_companies(cls, companies):
+        """由 Company 資料列（例如 RunJournal.results()）載入"""
+        return cls(CompanyBatch.from_companies(companies).to_frame())
+
+    @staticmethod
+    def _prepare(frame):
+        """統一欄位型別：文字欄為字串、數值欄為可為空的數值型別，並加上期間序號"""
+        frame = normalize_frame(frame)
+        for column in TEXT_COLUMNS:
+            frame[column] = frame[column].astype('string') if column in frame else pd.Series(dtype='string')
+        for column in frame.columns.difference(TEXT_COLUMNS):
+            if not pd.api.types.is_numeric_dtype(frame[column]):
+                frame[column] = pd.to_numeric(frame[column], errors='coerce')
+            frame[column] = frame[column].convert_dtypes(convert_string=False, convert_boolean=False)
+        if '產業類別' in frame:
+            frame['產業類別'] = frame['產業類別'].fillna(UNKNOWN_INDUSTRY)
+        # 期間序號 = 年度 × 4 + 季別 - 1，前一年同期為序號 - 4
+        frame['_period'] = (frame['年度'].astype('Int64') * 4 + frame['季別'].astype('Int64') - 1)
+        frame = frame.drop_duplicates(KEY_COLUMNS, keep='last')
+        return frame.sort_values(['_period', '公司代號'], ignore_index=True)
+
+    @property
+    def metrics(self):
+        """可計算的數值欄位"""
+        return [c for c in self.frame.columns if c not in TEXT_COLUMNS and c != '_period'
+                and pd.api.types.is_numeric_dtype(self.frame[c])]
+
+    @property
+    def periods(self):
+        """資料中的期間（依時間排序）"""
+        periods = self.frame[['年度', '季別', '_period']].drop_duplicates().sort_values('_period')
+        return list(zip(periods['年度'], periods['季別']))
+
+    def add(self, frame):
+        """加入新的資料列（同公司同期間以新資料為準），資料有變動時清除快取，回傳新增的期間"""
+        new = self._prepare(frame)
+        before = set(self.periods)
+        merged = self._prepare(pd.concat([self.frame.drop(columns='_period'), new.drop(columns='_period')],
+                                         ignore_index=True))
+        if merged.equals(self.frame):
+            return []
+        self.frame = merged
+        with self._lock:
+            self._cache.clear()
+        added = [period for period in self.periods if period not in before]
+        if added:
+            logger.info(f"新增期間 {', '.join(y + 'Q' + s.lstrip('0') for y, s in added)}，已清除彙總快取")
+        return added
+
+    def _cached(self, key, compute):
+        """以參數為鍵快取計算結果（回傳複本，呼叫端修改不影響快取）"""
+        with self._lock:
+            result = self._cache.get(key)
+        if result is None:
+            result = compute()
+            with self._lock:
+                self._cache[key] = result
+        return result.copy()
+
+    @staticmethod
+    def _periods_key(period):
+        """將期間參數（None、('113', '04') 或其清單）轉為可作為快取鍵的 tuple"""
+        if period is None:
+            return None
+        periods = [period] if isinstance(period[0], str) else list(period)
+        return tuple((str(year), str(season).zfill(2)) for year, season in periods)
+
+    def _select(self, periods=None):
+        """篩選期間（periods 為 _periods_key 的結果，None 表示全部）"""
+        if periods is None:
+            return self.frame
+        ordinals = [int(year) * 4 + int(season) - 1 for year, season in periods]
+        return self.frame[self.frame['_period'].isin(ordinals)]
+
+    def industry_summary(self, metrics=None, period=None, stats=('count', 'mean', 'median', 'sum')):
+        """各期間 × 產業的統計（家數、平均、中位數、合計），欄位為 (指標, 統計量)"""
+        metrics = tuple(metrics or self.metrics)
+        period = self._periods_key(period)
+        key = ('industry_summary', metrics, period, tuple(stats))
+
+        def compute():
+            frame = self._select(period)
+            return frame.groupby(['年度', '季別', '產業類別'], observed=True, sort=True)[list(metrics)] \
+                .agg(list(stats))
+
+        return self._cached(key, compute)
+
+    def percentile_ranks(self, metric='毛利率', by_industry=True, period=None):
+        """各公司在同期間（by_industry=True 時為同產業同期間）的百分位排名（0~1，越大越好）"""
+        period = self._periods_key(period)
+        key = ('percentile_ranks', metric, by_industry, period)
+
+        def compute():
+            frame = self._select(period)
+            groups = ['年度', '季別', '產業類別'] if by_industry else ['年度', '季別']
+            result = frame[TEXT_COLUMNS + [metric]].copy()
+            result[f'{metric}_百分位'] = frame.groupby(groups, observed=True)[metric].rank(pct=True)
+            result[f'{metric}_排名'] = frame.groupby(groups, observed=True)[metric] \
+                .rank(method='min', ascending=False).astype('Int64')
+            return result.reset_index(drop=True)
+
+        return self._cached(key, compute)
+
+    def top(self, metric='毛利率', n=10, period=None, industry=None):
+        """指定期間（預設最新一期）指標最高的 n 家公司"""
+        period = period or (self.periods[-1] if len(self.frame) else None)
+        ranks = self.percentile_ranks(metric, by_industry=False, period=period)
+        if industry:
+            ranks = ranks[ranks['產業類別'] == industry]
+        return ranks.sort_values(metric, ascending=False, na_position='last').head(n).reset_index(drop=True)
+
+    def growth(self, metric='年營收', years=1, period=None):
+        """與 years 年前同期相比的成長率；years > 1 時另計年複合成長率（CAGR）
+
+        基期數值為 0 或負數時成長率為缺值。
+        """
+        period = self._periods_key(period)
+        key = ('growth', metric, years, period)
+
+        def compute():
+            lag = 4 * years
+            current = self._select(period)[TEXT_COLUMNS + ['_period', metric]]
+            base = self.frame[['公司代號', '_period', metric]].rename(columns={metric: f'{metric}_基期'})
+            base['_period'] = base['_period'] + lag
+            result = current.merge(base, on=['公司代號', '_period'], how='left')
+            now = result[metric].astype('Float64')
+            then = result[f'{metric}_基期'].astype('Float64')
+            ratio = (now / then.where(then > 0)).astype('Float64')
+            result[f'{metric}_成長率'] = ratio - 1
+            if years > 1:
+                values = ratio.to_numpy(dtype='float64', na_value=np.nan)
+                with np.errstate(invalid='ignore'):
+                    result[f'{metric}_CAGR'] = pd.array(np.power(values, 1 / years) - 1, dtype='Float64')
+            return result.drop(columns='_period')
+
+        return self._cached(key, compute)
+
+    def industry_growth(self, metric='年營收', years=1, period=None):
+        """各產業合計指標與 years 年前同期相比的成長率（只計入兩期都有資料的公司）"""
+        period = self._periods_key(period)
+        key = ('industry_growth', metric, years, period)
+
+        def compute():
+            rows = self.growth(metric, years, period)
+            rows = rows[rows[metric].notna() & rows[f'{metric}_基期'].notna()]
+            totals = rows.groupby(['年度', '季別', '產業類別'], observed=True)[[metric, f'{metric}_基期']].sum()
+            totals['家數'] = rows.groupby(['年度', '季別', '產業類別'], observed=True).size()
+            base = totals[f'{metric}_基期'].astype('Float64')
+            totals[f'{metric}_成長率'] = totals[metric].astype('Float64') / base.where(base > 0) - 1
+            return totals
+
+        return self._cached(key, compute)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="爬取結果的產業彙總與排名")
+    parser.add_argument('--source', default='data/output/parquet',
+                        help="結果來源：Parquet 資料集目錄或 results.xlsx")
+    parser.add_argument('--metric', default='毛利率', help="排名與成長率使用的指標")
+    parser.add_argument('--top', type=int, default=10, help="列出最新一期指標最高的公司數")
+    parser.add_argument('--output', default=None, help="將彙總結果寫入 Excel（多個工作表）")
+    args = parser.parse_args()
+
+    if args.source.endswith(('.xlsx', '.xls')):
+        analytics = ResultsAnalytics.from_excel(args.source)
+    else:
+        analytics = ResultsAnalytics.from_parquet(args.source)
+    if analytics.frame.empty:
+        print(f"沒有可分析的資料: {args.source}")
+        raise SystemExit(1)
+    print(f"共 {analytics.frame['公司代號'].nunique()} 家公司、{len(analytics.periods)} 個期間")
+    summary = analytics.industry_summary()
+    print(summary.xs('mean', axis=1, level=1).round(2).to_string())
+    print(analytics.top(args.metric, args.top).to_string())
+    if args.output:
+        with pd.ExcelWriter(args.output) as writer:
+            summary.to_excel(writer, sheet_name='產業統計')
+            analytics.percentile_ranks(args.metric).to_excel(writer, sheet_name='百分位排名', index=False)
+            analytics.growth('年營收').to_excel(writer, sheet_name='營收年增率', index=False)
+            analytics.industry_growth('年營收').to_excel(writer, sheet_name='產業營收年增率')
+        print(f"彙總結果已保存至: {args.output}")
@@ -1,40 +1,38 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 from loguru import logger
 import pandas as pd
 import time
 import os
-import platform
+
+from src.utils.company_index import CompanyMasterIndex
+from src.utils.driver import WebDriver, WebDriverPool
 
 class CompanyCodeCrawler:
-    def __init__(self):
-        self.url = "https://mops.twse.com.tw/mops/#/web/home"
-        self.setup_driver()
+    URL = "https://mops.twse.com.tw/mops/#/web/home"
+
+    def __init__(self, driver_pool=None, master_index=None):
+        """初始化爬蟲類
+
+        driver_pool: 共用的 WebDriverPool
+        master_index: CompanyMasterIndex；未提供時於爬取前載入上市櫃公司名錄
+        """
+        self.url = self.URL
+        self.driver_pool = driver_pool
+        self.master_index = master_index
+        # 瀏覽器只在名錄查不到時才啟動
+        self.driver = None
+        self.wait = None
         self.companies = self.read_company_list()
         self.results = []
 
     def setup_driver(self):
-        """設置Chrome瀏覽器驅動"""
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')  # 無頭模式
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        
-        # 檢查是否為 Mac ARM64 架構
-        if platform.system() == 'Darwin' and platform.machine() == 'arm64':
-            chrome_options.add_argument('--disable-gpu')
-            service = Service()
-            self.driver = webdriver.Chrome(options=chrome_options)
+        """設置Chrome瀏覽器驅動（無頭模式）"""
+        if self.driver_pool:
+            self.driver = self.driver_pool.acquire()
         else:
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-        self.wait = WebDriverWait(self.driver, 10)
+            self.driver = WebDriver.create_driver(headless=True)
+        self.wait = WebDriver.create_wait(self.driver)
 
     def read_company_list(self):
         """從Excel檔案讀取公司列表"""
@@ -87,19 +85,31 @@ class CompanyCodeCrawler:
             return "查無資訊"
 
     def crawl_all_companies(self):
-        """爬取所有公司代碼"""
+        """爬取所有公司代碼（先以公司名錄比對，查不到的才用瀏覽器搜尋）"""
         try:
-            self.driver.get(self.url)
-            time.sleep(2)  # 等待頁面完全載入
-            
+            if self.master_index is None:
+                self.master_index = CompanyMasterIndex.load()
+
+            codes = [self.master_index.resolve(name) for name in self.companies]
+            unmatched = [name for name, code in zip(self.companies, codes) if not code]
+            logger.info(f"名錄比對成功 {len(codes) - len(unmatched)} 家，需以瀏覽器搜尋 {len(unmatched)} 家")
+
+            if unmatched:
+                self.setup_driver()
+                # 連線池借出的瀏覽器已預熱並停在首頁
+                if self.driver.current_url != self.url:
+                    self.driver.get(self.url)
+                    time.sleep(2)  # 等待頁面完全載入
+
             results = []
-            for company_name in self.companies:
-                company_code = self.search_company_code(company_name)
+            for company_name, company_code in zip(self.companies, codes):
+                if not company_code:
+                    company_code = self.search_company_code(company_name)
+                    time.sleep(1)  # 避免請求過於頻繁
                 results.append({
                     '公司名稱': company_name,
                     '公司代號': company_code
                 })
-                time.sleep(1)  # 避免請求過於頻繁
             
             # 保存結果
             df = pd.DataFrame(results)
@@ -110,12 +120,18 @@ class CompanyCodeCrawler:
         except Exception as e:
             logger.error(f"爬取過程中出錯: {str(e)}")
         finally:
-            self.driver.quit()
+            if self.driver is None:
+                pass
+            elif self.driver_pool:
+                self.driver_pool.release(self.driver)
+            else:
+                self.driver.quit()
 
 if __name__ == "__main__":
     # 確保data/input目錄存在
     os.makedirs(os.path.join('data', 'input'), exist_ok=True)
     
-    # 開始爬取
-    crawler = CompanyCodeCrawler()
-    crawler.crawl_all_companies() 
\ No newline at end of file
+    # 開始爬取（瀏覽器只在名錄查不到時才啟動，連線池不預熱）
+    with WebDriverPool(size=1, warm_url=CompanyCodeCrawler.URL, prewarm=False) as driver_pool:
+        crawler = CompanyCodeCrawler(driver_pool=driver_pool)
+        crawler.crawl_all_companies() 
\ No newline at end of file
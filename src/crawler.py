@@ -5,244 +5,804 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
 import pandas as pd
+import itertools
+import threading
 import time
 import os
 
+from src.utils.company_index import normalize_code
 from src.utils.driver import WebDriver
+from src.utils.http_client import HttpFetcher
+from src.utils.metrics import CrawlMetrics, TimedRateLimiter
+from src.utils.normalizer import AMOUNT_FIELDS, MARGIN_FIELDS, normalize_record
+from src.utils.rate_limiter import HostRateLimiter
+from src.utils.refresh import IncrementalPlanner
+from src.utils.retry import (
+    CircuitBreaker, CrawlError, NetworkError, NoDataError, RetryPolicy, ThrottledError, classify,
+    is_blocked_page, is_no_data_page, DRIVER, NETWORK, NO_DATA, UNKNOWN
+)
+from src.utils.scheduler import AsyncCrawlScheduler
+from src.utils.timing import LatencyTracker
 from src.utils.file_handler import FileHandler
+from src.utils.fixture_server import FixtureRecorder
 from src.utils.parser import DataParser
 from src.models.company import Company
 
 class MOPSCrawler:
-    def __init__(self):
-        """初始化爬蟲類"""
-        self.url = "https://mopsov.twse.com.tw/mops/web/index"
-        self.driver = WebDriver.create_driver()
+    ENGINES = ('selenium', 'http')
+    PARSE_MODES = ('html', 'element')
+    INDEX_URL = "https://mopsov.twse.com.tw/mops/web/index"
+
+    def __init__(self, engine='selenium', base_url=None, fallback=True,
+                 concurrency=1, rate_limit=2.0, task_timeout=120, parse_mode='html',
+                 driver_pool=None, cache=None, journal=None, resume=False, periods=None,
+                 rate_limiter=None, companies=None, sink=None, save_excel=True, reports=None,
+                 record_dir=None, metrics=None, quiet=False, max_attempts=3, circuit_breaker=None,
+                 incremental=False, recycle_after=500, max_browser_mb=1500, metadata=None):
+        """初始化爬蟲類
+
+        engine: 'selenium' 以瀏覽器操作；'http' 直接送出表單，失敗時（fallback=True）改用瀏覽器
+        concurrency: HTTP 引擎同時處理的公司數；rate_limit: 每秒對 MOPS 主機的請求上限
+        parse_mode: 瀏覽器頁面的解析方式，'html' 取頁面原始碼以 lxml 解析，'element' 逐格讀取 WebElement
+        driver_pool: 共用的 WebDriverPool；提供時向連線池借用已預熱的瀏覽器，結束時歸還
+        cache: ResponseCache；已快取的公司直接由快取頁面解析
+        journal: RunJournal，每家公司完成即寫入；resume=True 時略過紀錄檔中已成功的公司
+        periods: 要抓取的 (年度, 季別) 清單，預設為 [('113', '04')]
+        rate_limiter: 外部提供的限速器（例如多程序共用的 SharedRateLimiter），優先於 rate_limit
+        companies: 要爬取的公司清單，預設串流讀取 data/input/company_list.xlsx（已去除無效與重複的代號）
+        sink: ResultSink，每家公司完成即串流寫出（Parquet/CSV）；save_excel=False 時不產生 Excel
+        reports: 要抓取的報表（DataParser.REPORTS 的名稱），預設只抓 'income'；
+                 同一次搜尋後一併抓取，結果合併為每家公司每期一筆
+        record_dir: HTTP 引擎將實際回應另存為離線測試頁面的目錄（供 FixtureServer 重播）
+        metrics: CrawlMetrics，記錄計數器、延遲直方圖與每家公司的追蹤 span
+        quiet: 不輸出每家公司的進度文字
+        max_attempts: 每家公司（含第一次）的嘗試次數上限，只有限流、網路與瀏覽器錯誤會重試
+        circuit_breaker: 共用的 CircuitBreaker（例如多程序共用），網站限流時暫停所有請求
+        incremental: 增量更新，依紀錄檔只抓取尚未取得或可能已新公告的期間（需提供 journal，隱含 resume）
+        recycle_after / max_browser_mb: 瀏覽器處理達此家數，或記憶體（RSS）超過此 MB 數時重新啟動（0 表示不限）
+        metadata: CompanyMetadataStore；已知基本資料的公司不再搜尋（瀏覽器）或抓取基本資料頁（HTTP）
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"不支援的抓取引擎: {engine}")
+        if parse_mode not in self.PARSE_MODES:
+            raise ValueError(f"不支援的解析模式: {parse_mode}")
+        self.parse_mode = parse_mode
+        self.reports = list(reports or ['income'])
+        for report in self.reports:
+            if report not in DataParser.REPORTS:
+                raise ValueError(f"不支援的報表: {report}")
+        self.url = self.INDEX_URL
+        self.periods = list(periods or [('113', '04')])
+        self.engine = engine
+        self.fallback = fallback
+        self.concurrency = concurrency
+        self.task_timeout = task_timeout
+        self.cache = cache
+        self.metadata = metadata
+        if incremental and journal is None:
+            raise ValueError("增量模式需要紀錄檔（journal）")
+        self.journal = journal
+        self.incremental = incremental
+        self.resume = resume or incremental
+        self.sink = sink
+        self.save_excel = save_excel
+        self.quiet = quiet
+        self.metrics = metrics or CrawlMetrics()
+        self.timings = LatencyTracker(self.metrics)
+        # 所有重試都由同一個策略處理；斷路器開啟時限速器一併暫停請求
+        self.breaker = circuit_breaker or CircuitBreaker()
+        self.retry_policy = RetryPolicy(max_attempts, breaker=self.breaker, metrics=self.metrics)
+        # HTTP 請求與瀏覽器的搜尋/提交共用同一個限速器（等待時間記入 metrics）
+        self.rate_limiter = TimedRateLimiter(rate_limiter or HostRateLimiter(rate_limit), self.metrics,
+                                             breaker=self.breaker)
+        self.fetcher = None
+        if engine == 'http':
+            self.fetcher = HttpFetcher(
+                base_url,
+                pool_size=max(10, concurrency),
+                rate_limiter=self.rate_limiter,
+                cache=cache,
+                metrics=self.metrics,
+                recorder=FixtureRecorder(record_dir) if record_dir else None
+            )
+        # 多種報表時，同一期間的各報表同時抓取
+        self._report_executor = None
+        if engine == 'http' and len(self.reports) > 1:
+            self._report_executor = ThreadPoolExecutor(
+                max_workers=max(1, concurrency) * len(self.reports),
+                thread_name_prefix='report'
+            )
+        # 逾時的公司：其執行緒事後完成時不再寫出結果（'abandoned' / 'done'）
+        self._task_state = {}
+        self._task_lock = threading.Lock()
+        # 瀏覽器只有一個，並行時需序列化存取
+        self._browser_lock = threading.RLock()
+        self.driver_pool = driver_pool
+        self.recycle_after = recycle_after
+        self.max_browser_mb = max_browser_mb
+        self._browser_companies = 0
+        self.driver = None
+        self.wait = None
+        self.short_wait = None
+        if engine == 'selenium':
+            self._start_driver()
+        if companies is None:
+            companies = FileHandler.iter_company_list()
+        # 可重複迭代的來源（清單、CompanySource）保持串流，一次性的迭代器才收集為清單
+        self.companies = list(companies) if isinstance(companies, Iterator) else companies
+        self.results = []
+
+    def _start_driver(self):
+        """啟動瀏覽器驅動（有連線池時向連線池借用）"""
+        if self.driver_pool:
+            self.driver = self.driver_pool.acquire()
+        else:
+            self.driver = WebDriver.create_driver()
+        self._browser_companies = 0
         self.wait = WebDriver.create_wait(self.driver)
         self.short_wait = WebDriver.create_wait(self.driver, 3)
-        self.companies = FileHandler.read_company_list()
-        self.results = []
 
-    def retry_on_connection_error(self, func, max_retries=3):
-        """帶重試機制的函數執行器"""
-        for attempt in range(max_retries):
-            try:
-                return func()
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    raise e
-                print(f"連線出錯，等待後重試... (第 {attempt + 1} 次)")
-                time.sleep(5 * (attempt + 1))
-                
-                try:
-                    self.driver.refresh()
-                except:
-                    pass
-                    
-                try:
-                    if self.driver.current_url == "about:blank" or "autoAction" in self.driver.current_url:
-                        print("檢測到主頁面錯誤，嘗試重新訪問...")
-                        self.driver.get(self.url)
-                        time.sleep(3)
-                except:
-                    pass
-
-    def search_company(self, company):
-        """搜尋公司資訊"""
-        def search_action():
-            main_window = None
-            new_window = None
-            
-            try:
-                # 檢查公司代碼
-                if not company.code or company.code == '查無資訊':
-                    logger.warning(f"公司 {company.name} 無代碼資訊")
-                    return None
-
-                print("\n" + "="*50)
-                print(f"開始處理公司：{company.name}")
-                print(f"公司代碼：{company.code}")
-                print("="*50)
-
-                # 搜尋公司
-                search_box = self.wait.until(
-                    EC.presence_of_element_located((By.ID, "keyword"))
-                )
-                search_box.clear()
-                search_box.send_keys(company.code)
-                time.sleep(1)
+    def _ensure_browser(self):
+        """確保瀏覽器已啟動並停在首頁（HTTP 引擎的備援路徑）"""
+        if self.driver is None:
+            logger.info("啟動瀏覽器作為備援")
+            self._start_driver()
+            self.retry_policy.call(self._init_page, on_retry=self._recover, label="載入首頁")
 
-                # 點擊搜尋
-                search_button = self.wait.until(
-                    EC.element_to_be_clickable((By.ID, "rulesubmit"))
-                )
-                search_button.click()
-                time.sleep(3)
+    def _init_page(self):
+        """開啟首頁並等待搜尋框出現"""
+        # 連線池借出的瀏覽器已停在首頁，不必重新載入
+        if "index" not in self.driver.current_url:
+            self.driver.get(self.url)
+        self._wait_for_index()
 
-                # 獲取公司資訊
-                main_window = self.driver.current_window_handle
-                company_info = DataParser.parse_company_info(self.driver)
-                if company_info:
-                    company.industry = company_info.get('產業類別')
-                    print(f"\n公司基本資訊：")
-                    print(f"公司名稱：{company_info['公司名稱']}")
-                    print(f"公司代號：{company_info['公司代號']}")
-                    print(f"產業類別：{company.industry}")
-
-                # 點擊財務報表
-                self.wait.until(
-                    EC.element_to_be_clickable((By.ID, "button11"))
-                )
-
-                # 提交表單
-                js_code = """
-                var form = document.fm1;
-                form.step.value = '1';
-                form.co_id.value = arguments[0];
-                form.year.value = '113';
-                form.season.value = '04';
-                form.action = '/mops/web/ajax_t164sb04';
-                form.target = '_blank';
-                form.submit();
-                """
-                
-                current_handles = set(self.driver.window_handles)
-                self.driver.execute_script(js_code, company.code)
-                time.sleep(2)
-
-                # 處理新視窗
-                new_window = self._wait_for_new_window(current_handles)
-                if not new_window:
-                    print("無法找到包含數據的視窗")
-                    return None
-
-                # 解析財務數據
-                tables = self.driver.find_elements(By.CLASS_NAME, "hasBorder")
-                if tables:
-                    financial_data = DataParser.parse_financial_data(tables[0])
-                    if financial_data:
-                        company.annual_revenue = financial_data.annual_revenue
-                        company.gross_profit = financial_data.gross_profit
-                        company.gross_margin = financial_data.gross_margin
-                        company.profit_before_tax = financial_data.profit_before_tax
-                        company.profit_after_tax = financial_data.profit_after_tax
-                        
-                        print(f"\n財務數據：")
-                        print(f"年營收：{company.annual_revenue}")
-                        print(f"毛利額：{company.gross_profit}")
-                        print(f"毛利率：{company.gross_margin}")
-                        print(f"稅前淨利：{company.profit_before_tax}")
-                        print(f"稅後淨利：{company.profit_after_tax}")
-                        print("-" * 50)
-                    else:
-                        print("警告：未找到任何財務數據")
-                else:
-                    print("警告：未找到財務數據表格")
+    def _wait_for_index(self):
+        """等待首頁載入完成且搜尋框可用"""
+        self.wait.until(lambda d: d.execute_script('return document.readyState') == 'complete')
+        self.wait.until(EC.presence_of_element_located((By.ID, "keyword")))
 
+    def _recover(self, error, kind, attempt):
+        """重試前的復原：瀏覽器當掉時重新啟動，其他錯誤重新載入首頁（HTTP 引擎不需處理）"""
+        with self._browser_lock:
+            if self.driver is None:
+                return
+            try:
+                if kind == DRIVER:
+                    logger.warning("瀏覽器無回應，重新啟動")
+                    self._restart_driver()
+                self.driver.get(self.url)
+                self._wait_for_index()
             except Exception as e:
-                print(f"處理公司 {company.name} 時出錯: {str(e)}")
-                return None
-            
-            finally:
-                self._cleanup_windows(main_window)
-                
-            return company
+                logger.warning(f"重新載入首頁失敗: {str(e)}")
 
+    def _restart_driver(self):
+        """關閉目前的瀏覽器並重新啟動（連線池借出的瀏覽器直接丟棄）"""
         try:
-            return self.retry_on_connection_error(search_action)
+            if self.driver_pool:
+                self.driver_pool.release(self.driver, discard=True)
+            else:
+                self.driver.quit()
         except Exception as e:
-            logger.error(f"搜尋公司 {company.name} ({company.code}) 時出錯: {str(e)}")
-            return None
+            logger.debug(f"關閉瀏覽器時出錯: {str(e)}")
+        self.driver = None
+        self._start_driver()
 
-    def _wait_for_new_window(self, current_handles, max_wait=10):
-        """等待新視窗開啟"""
-        for _ in range(max_wait):
+    def search_company(self, company, periods=None):
+        """搜尋公司資訊，回傳各期間的資料列（list）
+
+        公司關鍵字搜尋只做一次，之後在同一個連線中依序抓取各期間的財報。
+        無代碼時拋出 NoDataError；限流、5xx、逾時、頁面內容異常等暫時性錯誤直接拋出交給重試策略，
+        HTTP 頁面明確回應查無資料時回傳空清單，兩者都不改用瀏覽器；只有無法分類的錯誤才改用瀏覽器。
+        """
+        periods = periods or self.periods
+        if not company.code or company.code == '查無資訊':
+            raise NoDataError(f"公司 {company.name} 無代碼資訊")
+        if self.engine == 'http':
             try:
-                new_handles = set(self.driver.window_handles) - current_handles
-                if new_handles:
-                    for handle in new_handles:
-                        self.driver.switch_to.window(handle)
-                        if "ajax_t164sb04" in self.driver.current_url:
-                            return handle
-                        self.driver.close()
+                # 各頁面皆已確認為資料表或「查詢無資料」，沒有資料列即為查無資料
+                return self._search_company_http(company, periods)
             except Exception as e:
-                print(f"切換視窗時出錯: {str(e)}")
-            time.sleep(1)
-        return None
+                # 已分類的錯誤交給重試策略與紀錄（限流時改用瀏覽器只會讓情況更糟）；其他錯誤才改用瀏覽器
+                if not self.fallback or classify(e) != UNKNOWN:
+                    raise
+                logger.warning(f"HTTP 抓取公司 {company.name} ({company.code}) 時出錯: {str(e)}")
+            logger.info(f"改用瀏覽器抓取公司 {company.name}")
+
+        with self._browser_lock:
+            self._ensure_browser()
+            return self._search_company_browser(company, periods)
 
-    def _cleanup_windows(self, main_window):
-        """清理視窗"""
+    def _search_company_http(self, company, periods):
+        """以 HTTP 直接抓取公司資訊與各期間財務數據"""
+        self._print_banner(company)
+
+        company_info = self._known_company_info(company)
+        if company_info is None:
+            with self.timings.phase('fetch'):
+                profile = self.fetcher.fetch_company_profile(company.code)
+            self._check_page(profile, company.code, 'ajax_t05st03')
+            with self.timings.phase('parse'):
+                company_info = DataParser.parse_company_info_html(profile)
+            self._check_company_info(company, company_info)
+            self._remember_company_info(company, company_info)
+        if company_info:
+            self._apply_company_info(company, company_info)
+
+        records = []
+        for year, season in periods:
+            pages = self._fetch_reports_http(company.code, year, season)
+            with self.timings.phase('parse'):
+                parsed = self._parse_reports(pages)
+            record = company.for_period(year, season)
+            if self._apply_financial_data(record, parsed):
+                records.append(record)
+            else:
+                logger.warning(f"公司 {company.name} 無 {year} 年第 {season} 季財務數據")
+        return records
+
+    def _fetch_reports_http(self, code, year, season):
+        """抓取單一期間的各報表頁面，回傳 {報表: HTML}"""
+        parent = self.metrics.current_span()
+
+        def fetch(report):
+            endpoint = DataParser.report_endpoint(report)
+            # 在報表執行緒中延續公司的追蹤 span
+            with self.metrics.attach(parent), self.timings.phase('fetch'):
+                html = self.fetcher.fetch_page(endpoint, code, year, season)
+            self._check_page(html, code, endpoint)
+            return html
+
+        if self._report_executor is None:
+            return {report: fetch(report) for report in self.reports}
+        return dict(zip(self.reports, self._report_executor.map(fetch, self.reports)))
+
+    @staticmethod
+    def _check_page(html, code, endpoint):
+        """HTTP 頁面須含資料表或「查詢無資料」；其他內容（如「系統忙碌中」）拋出可重試的 NetworkError"""
+        if 'hasBorder' not in (html or '') and not is_no_data_page(html):
+            raise NetworkError(f"頁面內容異常: {code} {endpoint}")
+
+    def _parse_reports(self, pages):
+        """解析各報表頁面，回傳 {報表: 解析結果}（無資料的報表為 None）"""
+        return {
+            report: DataParser.parse_financial_html(html, report=report) if html else None
+            for report, html in pages.items()
+        }
+
+    def _known_company_info(self, company):
+        """由 metadata store 取得已知的公司基本資料，未知時回傳 None"""
+        if self.metadata is None:
+            return None
+        company_info = self.metadata.get(company.code)
+        self.metrics.inc('metadata_requests_total', result='hit' if company_info else 'miss')
+        return company_info
+
+    @staticmethod
+    def _check_company_info(company, company_info):
+        """確認解析到的是目前公司的資訊；頁面仍是上一家公司時拋出可重試的 NetworkError"""
+        code = company_info.get('公司代號') if company_info else None
+        if code and code != '無資料' and normalize_code(code) != normalize_code(company.code):
+            raise NetworkError(f"頁面上的公司代號為 {code}，不是 {company.code}（搜尋結果尚未更新）")
+
+    def _remember_company_info(self, company, company_info):
+        """將搜尋或基本資料頁取得的公司資訊寫入 metadata store（查無資料時不寫入）"""
+        if self.metadata is None or not company_info:
+            return
+        industry = company_info.get('產業類別')
+        if industry and industry != '無資料':
+            self.metadata.put(company.code, company_info.get('公司名稱'), industry)
+
+    def _load_from_cache(self, company, periods, company_info=None):
+        """瀏覽器路徑：由快取解析已有的期間，回傳 (資料列, 仍需抓取的期間)
+
+        公司資訊優先使用 company_info（metadata store 中的基本資料），沒有時取自快取的搜尋結果頁。
+        """
+        if not self.cache:
+            return [], list(periods)
+        search_page = None if company_info else self.cache.get('search', company.code)
+        if not company_info and not search_page:
+            return [], list(periods)
+
+        records = []
+        missing = []
+        for year, season in periods:
+            # 所有報表都已快取的期間才直接使用，否則整期重新抓取
+            pages = {
+                report: self.cache.get(DataParser.report_endpoint(report), company.code, year, season)
+                for report in self.reports
+            }
+            parsed = self._parse_reports(pages) if all(pages.values()) else {}
+            self.metrics.inc('cache_requests_total', result='hit' if any(parsed.values()) else 'miss')
+            if any(parsed.values()):
+                record = company.for_period(year, season)
+                records.append((record, parsed))
+            else:
+                missing.append((year, season))
+
+        if records:
+            company_info = company_info or DataParser.parse_company_info_html(search_page)
+            if company_info:
+                self._apply_company_info(company, company_info)
+            for record, parsed in records:
+                record.industry = company.industry
+                self._apply_financial_data(record, parsed)
+        return [record for record, _ in records], missing
+
+    def _wait_for_search_result(self, code):
+        """等待搜尋結果顯示目前公司的代號（避免讀到上一家公司的結果）"""
+        xpath = f"//div[contains(@style, 'font-weight:bold') and contains(., '{code}')]"
         try:
-            all_handles = self.driver.window_handles
-            if main_window and main_window in all_handles:
-                for handle in all_handles:
-                    if handle != main_window:
-                        self.driver.switch_to.window(handle)
-                        self.driver.close()
-                self.driver.switch_to.window(main_window)
+            self.wait.until(EC.presence_of_element_located((By.XPATH, xpath)))
+        except Exception:
+            logger.warning(f"等待公司 {code} 的搜尋結果逾時")
+
+    def _print_banner(self, company):
+        """輸出開始處理公司的標題（quiet 模式不輸出）"""
+        if self.quiet:
+            return
+        print("\n" + "="*50)
+        print(f"開始處理公司：{company.name}")
+        print(f"公司代碼：{company.code}")
+        print("="*50)
+
+    def _apply_company_info(self, company, company_info):
+        """寫入公司基本資訊"""
+        company.industry = company_info.get('產業類別')
+        if self.quiet:
+            return
+        print(f"\n公司基本資訊：")
+        print(f"公司名稱：{company_info['公司名稱']}")
+        print(f"公司代號：{company_info['公司代號']}")
+        print(f"產業類別：{company.industry}")
+
+    def _apply_financial_data(self, company, parsed):
+        """合併各報表的財務數據（company 為單一期間的資料列），至少一份報表有資料時回傳 True"""
+        found = [report for report in self.reports if parsed.get(report)]
+        if not found:
+            return False
+        for report in found:
+            financial_data = parsed[report]
+            for attr in (*AMOUNT_FIELDS, *MARGIN_FIELDS):
+                value = getattr(financial_data, attr)
+                if value is not None:
+                    setattr(company, attr, value)
+            if financial_data.metrics:
+                company.metrics = {**(company.metrics or {}), **financial_data.metrics}
+        for report in self.reports:
+            if report not in found:
+                logger.warning(f"公司 {company.name} 無 {company.year} 年第 {company.season} 季 {report} 報表數據")
+
+        if self.quiet:
+            return True
+        print(f"\n財務數據（{company.year} 年第 {company.season} 季）：")
+        print(f"年營收：{company.annual_revenue}")
+        print(f"毛利額：{company.gross_profit}")
+        print(f"毛利率：{company.gross_margin}")
+        print(f"稅前淨利：{company.profit_before_tax}")
+        print(f"稅後淨利：{company.profit_after_tax}")
+        for name, value in (company.metrics or {}).items():
+            print(f"{name}：{value}")
+        print("-" * 50)
+        return True
+
+    def _search_company_browser(self, company, periods):
+        """以瀏覽器搜尋公司資訊，並在同一次搜尋後依序抓取各期間財報（基本資料已知時略過搜尋）"""
+        self._print_banner(company)
+
+        company_info = self._known_company_info(company)
+        records, missing = self._load_from_cache(company, periods, company_info)
+        if not missing:
+            return records
+
+        if company_info:
+            # 基本資料已知，不需搜尋，直接以首頁的表單提交各期間財報
+            self._apply_company_info(company, company_info)
+        else:
+            self._search_company_info(company)
+
+        # 依序提交各期間的財報表單
+        for year, season in missing:
+            record = company.for_period(year, season)
+            if self._fetch_statement_browser(record):
+                records.append(record)
+        return records
+
+    def _search_company_info(self, company):
+        """以首頁搜尋框查詢公司，解析並記錄公司資訊"""
+        with self.timings.phase('search'):
+            search_box = self.wait.until(
+                EC.presence_of_element_located((By.ID, "keyword"))
+            )
+            search_box.clear()
+            search_box.send_keys(company.code)
+            self.wait.until(lambda d: search_box.get_attribute('value') == company.code)
+
+            # 點擊搜尋
+            search_button = self.wait.until(
+                EC.element_to_be_clickable((By.ID, "rulesubmit"))
+            )
+            self.rate_limiter.acquire(self.url)
+            search_button.click()
+            self._wait_for_search_result(company.code)
+
+            # 等待財務報表按鈕可用
+            self.wait.until(
+                EC.element_to_be_clickable((By.ID, "button11"))
+            )
+
+        # 獲取公司資訊
+        info_source = None
+        with self.timings.phase('parse'):
+            if self.parse_mode == 'html':
+                info_source = self.driver.page_source
+                if is_blocked_page(info_source):
+                    raise ThrottledError(f"網站阻擋查詢: {company.code}")
+                company_info = DataParser.parse_company_info_html(info_source)
             else:
-                first_window = all_handles[0]
-                for handle in all_handles[1:]:
-                    self.driver.switch_to.window(handle)
-                    self.driver.close()
-                self.driver.switch_to.window(first_window)
-        except Exception as e:
-            print(f"清理視窗時出錯: {str(e)}")
+                company_info = DataParser.parse_company_info(self.driver)
+        # 等待搜尋結果逾時只會記錄警告，寫入快取與 metadata store 前須確認不是上一家公司的資訊
+        self._check_company_info(company, company_info)
+        if company_info:
+            self._apply_company_info(company, company_info)
+            self._remember_company_info(company, company_info)
+
+        if self.cache and info_source:
+            self.cache.put('search', company.code, info_source)
+
+    def _fetch_statement_browser(self, record):
+        """在搜尋結果頁提交單一期間各報表的表單並解析，成功時回傳 True
+
+        各報表表單送往首頁中固定的隱藏 iframe（每種報表一個，重複使用），
+        同時載入後逐一解析，不再為每家公司開關視窗。
+        """
+        # 提交表單：先重設 iframe 的載入旗標，onload 時設為 1
+        js_code = """
+        var frame = document.getElementsByName(arguments[4])[0];
+        frame.setAttribute('data-loaded', '0');
+        frame.onload = function() { frame.setAttribute('data-loaded', '1'); };
+        var form = document.fm1;
+        form.step.value = '1';
+        form.co_id.value = arguments[0];
+        form.year.value = arguments[1];
+        form.season.value = arguments[2];
+        form.action = '/mops/web/' + arguments[3];
+        form.target = arguments[4];
+        form.submit();
+        """
+
+        endpoints = {DataParser.report_endpoint(report): report for report in self.reports}
+        with self.timings.phase('statement_load'):
+            self._ensure_report_frames(endpoints)
+            for endpoint in endpoints:
+                self.rate_limiter.acquire(self.url)
+                self.driver.execute_script(js_code, record.code, record.year, record.season,
+                                           endpoint, self._frame_name(endpoint))
+            loaded = self._wait_for_frames(endpoints)
+            if len(loaded) < len(endpoints):
+                # 頁面未載入是網路或網站的暫時性問題，不是查無資料，交給重試策略
+                pending = ', '.join(endpoint for endpoint in endpoints if endpoint not in loaded)
+                raise NetworkError(f"財報頁面載入逾時: {record.code} {record.year}Q{record.season} {pending}")
+
+        parsed = {}
+        for endpoint in loaded:
+            report = endpoints[endpoint]
+            # 解析財務數據（html 模式一次取回頁面原始碼，不逐格呼叫 WebDriver）
+            with self.timings.phase('parse'):
+                financial_data = None
+                if self.parse_mode == 'html':
+                    # iframe 與首頁同源，可直接取回其原始碼，不需切換 frame
+                    source = self.driver.execute_script(
+                        "return document.getElementsByName(arguments[0])[0]"
+                        ".contentDocument.documentElement.outerHTML;",
+                        self._frame_name(endpoint)
+                    ) or ''
+                    if is_blocked_page(source):
+                        raise ThrottledError(f"網站阻擋查詢: {record.code} {endpoint}")
+                    tables = [source] if 'hasBorder' in source else []
+                    # 只有頁面明確回應查無資料才視為無資料，其他頁面（錯誤頁、空白頁）可重試
+                    if not tables and not is_no_data_page(source):
+                        raise NetworkError(f"財報頁面內容異常: {record.code} {endpoint}")
+                    if tables:
+                        financial_data = DataParser.parse_financial_html(tables[0], report=report)
+                else:
+                    self.driver.switch_to.frame(self._frame_name(endpoint))
+                    try:
+                        tables = self.driver.find_elements(By.CLASS_NAME, "hasBorder")
+                        if tables:
+                            financial_data = DataParser.parse_financial_data(tables[0], report=report)
+                    finally:
+                        self.driver.switch_to.default_content()
+
+            if not tables:
+                print(f"警告：未找到 {record.year} 年第 {record.season} 季 {report} 報表表格")
+                continue
+            if not financial_data:
+                print(f"警告：未找到 {record.year} 年第 {record.season} 季 {report} 報表任何數據")
+                continue
+
+            parsed[report] = financial_data
+            if self.cache and self.parse_mode == 'html':
+                self.cache.put(endpoint, record.code, source, record.year, record.season)
+
+        return self._apply_financial_data(record, parsed)
+
+    @staticmethod
+    def _frame_name(endpoint):
+        """報表 iframe 的名稱"""
+        return f"mops_report_{endpoint}"
+
+    def _ensure_report_frames(self, endpoints):
+        """在目前頁面建立各報表的隱藏 iframe（已存在時沿用；首頁重新載入後才會重建）"""
+        self.driver.execute_script("""
+        for (var i = 0; i < arguments[0].length; i++) {
+            var name = arguments[0][i];
+            if (document.getElementsByName(name).length) continue;
+            var frame = document.createElement('iframe');
+            frame.name = name;
+            frame.style.display = 'none';
+            document.body.appendChild(frame);
+        }
+        """, [self._frame_name(endpoint) for endpoint in endpoints])
+
+    def _wait_for_frames(self, endpoints, max_wait=10, poll_interval=0.1):
+        """等待各報表 iframe 載入完成，回傳已載入的端點（每 poll_interval 秒檢查一次，最多 max_wait 秒）
+
+        逾時仍未載入的端點不列入結果。
+        """
+        names = [self._frame_name(endpoint) for endpoint in endpoints]
+        script = """
+        return arguments[0].map(function(name) {
+            var frame = document.getElementsByName(name)[0];
+            return !!frame && frame.getAttribute('data-loaded') === '1';
+        });
+        """
+        loaded = []
+        deadline = time.monotonic() + max_wait
+        while time.monotonic() < deadline:
+            flags = self.driver.execute_script(script, names)
+            loaded = [endpoint for endpoint, flag in zip(endpoints, flags) if flag]
+            if len(loaded) == len(names):
+                break
+            time.sleep(poll_interval)
+        return loaded
 
     def crawl_all_companies(self):
         """爬取所有公司資訊"""
         try:
-            def init_page():
-                self.driver.get(self.url)
-                self.wait.until(lambda d: d.execute_script('return document.readyState') == 'complete')
-                self.wait.until(EC.presence_of_element_located((By.ID, "keyword")))
-                time.sleep(2)
-            
-            self.retry_on_connection_error(init_page)
-            
-            for company in self.companies:
-                retry_count = 0
-                max_retries = 3
-                success = False
-                
-                while not success and retry_count < max_retries:
-                    try:
-                        logger.info(f"正在爬取公司: {company.name} ({company.code or '無代碼'})")
-                        
-                        if "index" not in self.driver.current_url:
-                            self.driver.get(self.url)
-                            time.sleep(3)
-                        
-                        result = self.search_company(company)
-                        if result:
-                            self.results.append(result)
-                            success = True
-                        else:
-                            raise Exception("未能獲取有效數據")
-                            
-                    except Exception as e:
-                        retry_count += 1
-                        if retry_count < max_retries:
-                            print(f"處理公司 {company.name} 時出錯，等待後重試... (第 {retry_count} 次)")
-                            time.sleep(5 * retry_count)
-                            try:
-                                self.driver.get(self.url)
-                                time.sleep(3)
-                            except:
-                                pass
-                        else:
-                            logger.error(f"處理公司 {company.name} 失敗，已達到最大重試次數")
-                
-                time.sleep(3)
-                
-            FileHandler.save_results(self.results)
+            if self.incremental:
+                self.journal.compact()
+            tasks = self.build_tasks(self.companies, self.periods, self.journal, self.resume,
+                                     self.incremental)
+            # 任務為串流，先取第一個任務，確定有工作時才載入首頁
+            first = next(tasks, None)
+            tasks = itertools.chain([first], tasks) if first else iter(())
+            if first:
+                self.prepare()
+            if self.journal:
+                self.journal.start(self.resume)
+
+            self.results.extend(self.run_tasks(tasks))
+
+            # 有紀錄檔時以紀錄檔為準（含續跑前已完成的公司），依公司 × 期間排列
+            if self.journal:
+                self.results = self.journal.results(
+                    self.journal_keys(self.journal, self.companies, self.periods)
+                )
+            if self.save_excel:
+                FileHandler.save_results(self.results)
+            self.timings.log_summary()
+            if self.cache:
+                logger.info(f"快取統計: {self.cache.stats()}")
+            if self.metadata is not None:
+                logger.info(f"公司基本資料統計: {self.metadata.stats()}")
             
         except Exception as e:
             logger.error(f"爬取過程中出錯: {str(e)}")
         finally:
-            self.driver.quit()
+            self.close()
+
+    @staticmethod
+    def build_tasks(companies, periods, journal=None, resume=False, incremental=False):
+        """依序產生任務，每個任務為 (公司, 待抓取期間)；companies 可為串流，不需先全部讀入
+
+        續跑時略過紀錄檔中已成功的期間；增量模式另依公告期限判斷查無資料的期間是否需要再查。
+        """
+        if journal and incremental:
+            return IncrementalPlanner(journal).plan(companies, periods)
+        if journal and resume:
+            return MOPSCrawler._resume_tasks(companies, periods, journal)
+        return ((company, list(periods)) for company in companies)
+
+    @staticmethod
+    def _resume_tasks(companies, periods, journal):
+        """續跑：略過紀錄檔中已成功的期間"""
+        done = journal.completed_keys()
+        skipped = 0
+        for company in companies:
+            todo = [p for p in periods if journal.key(company, *p) not in done]
+            if todo:
+                yield company, todo
+            else:
+                skipped += 1
+        logger.info(f"續跑模式：略過 {skipped} 家已完成的公司")
+
+    @staticmethod
+    def journal_keys(journal, companies, periods):
+        """依公司 × 期間的順序列出紀錄鍵值"""
+        return [journal.key(company, *period) for company in companies for period in periods]
+
+    def run_tasks(self, tasks):
+        """執行任務清單，依輸入順序回傳取得的資料列"""
+        results = []
+        with self._task_lock:
+            self._task_state.clear()
+        if self.engine == 'http' and self.concurrency > 1:
+            scheduler = AsyncCrawlScheduler(
+                lambda task: self._crawl_company(*task),
+                concurrency=self.concurrency,
+                task_timeout=self.task_timeout,
+                on_timeout=self._abandon_task
+            )
+            for records in scheduler.run(tasks):
+                results.extend(records or [])
+        else:
+            # 不再固定間隔，請求頻率由 rate_limiter 控制
+            for company, periods in tasks:
+                results.extend(self._crawl_company(company, periods) or [])
+        return results
+
+    def _abandon_task(self, task):
+        """公司處理逾時：記錄為網路類失敗（之後會重新抓取），並阻止其執行緒事後寫出結果"""
+        company, periods = task
+        with self._task_lock:
+            if self._task_state.get(self._task_key(company)) == 'done':
+                return
+            self._task_state[self._task_key(company)] = 'abandoned'
+        self.metrics.inc('task_timeouts_total')
+        if self.journal:
+            for year, season in periods:
+                self.journal.record(company.for_period(year, season), success=False,
+                                    error=f"{NETWORK}: 處理逾時（超過 {self.task_timeout} 秒）")
+
+    @staticmethod
+    def _task_key(company):
+        return company.code or company.name
+
+    def _is_abandoned(self, company):
+        with self._task_lock:
+            return self._task_state.get(self._task_key(company)) == 'abandoned'
+
+    def _claim_result(self, company):
+        """準備寫出公司結果；已逾時放棄的公司回傳 False，結果不再寫入輸出與紀錄檔"""
+        with self._task_lock:
+            if self._task_state.get(self._task_key(company)) == 'abandoned':
+                logger.warning(f"公司 {company.name} 已逾時，捨棄其後完成的結果")
+                return False
+            self._task_state[self._task_key(company)] = 'done'
+            return True
+
+    def prepare(self):
+        """瀏覽器引擎開始爬取前先載入首頁"""
+        if self.driver:
+            self.retry_policy.call(self._init_page, on_retry=self._recover, label="載入首頁")
+
+    def _crawl_company(self, company, periods=None):
+        """爬取單一公司的各期間（含重試），回傳取得的資料列"""
+        periods = periods or self.periods
+        with self.metrics.span('company', code=company.code, company=company.name) as span:
+            records = self._crawl_with_retry(company, periods)
+            span['attrs']['records'] = len(records or [])
+        found = len(records or [])
+        self.metrics.inc('companies_total', status='success' if records else 'failed')
+        self.metrics.inc('periods_total', found, status='success')
+        self.metrics.inc('periods_total', len(periods) - found, status='failed')
+        self.metrics.observe('company_seconds', span['duration'])
+        self._check_browser()
+        self.metrics.flush()
+        return records
+
+    def _check_browser(self):
+        """每處理一家公司後記錄瀏覽器記憶體，處理家數或記憶體超過門檻時重新啟動瀏覽器"""
+        with self._browser_lock:
+            if self.driver is None:
+                return
+            self._browser_companies += 1
+            rss = WebDriver.memory_usage(self.driver)
+            if rss is not None:
+                self.metrics.set('browser_rss_bytes', rss)
+            if self.recycle_after and self._browser_companies >= self.recycle_after:
+                reason = 'companies'
+            elif rss is not None and self.max_browser_mb and rss > self.max_browser_mb * 1024 * 1024:
+                reason = 'memory'
+            else:
+                return
+            size = f"{rss / 1024 / 1024:.0f} MB" if rss is not None else "未知"
+            logger.info(f"瀏覽器已處理 {self._browser_companies} 家公司，記憶體 {size}，重新啟動")
+            self.metrics.inc('browser_recycles_total', reason=reason)
+            try:
+                # 下一家公司開始時會重新載入首頁
+                self._restart_driver()
+            except Exception as e:
+                logger.error(f"重新啟動瀏覽器失敗: {str(e)}")
+
+    def _crawl_with_retry(self, company, periods):
+        """依重試策略處理單一公司，回傳取得的資料列，失敗時回傳 None
+
+        查無資料等永久性錯誤不重試；限流、網路與瀏覽器錯誤以指數退避重試。
+        """
+        try:
+            return self.retry_policy.call(
+                lambda: self._crawl_once(company, periods),
+                on_retry=self._recover,
+                label=f"處理公司 {company.name} 時"
+            )
+        except Exception as e:
+            kind = classify(e)
+            if not self._claim_result(company):
+                return None
+            if kind == NO_DATA:
+                logger.warning(f"公司 {company.name} ({company.code or '無代碼'}) 查無資料: {str(e)}")
+            else:
+                logger.error(f"處理公司 {company.name} 失敗（{kind}）: {str(e)}")
+            if self.journal:
+                for year, season in periods:
+                    self.journal.record(company.for_period(year, season), success=False,
+                                        error=f"{kind}: {str(e)}")
+        return None
+
+    def _crawl_once(self, company, periods):
+        """處理單一公司一次，無任何期間資料時拋出 NoDataError"""
+        if self._is_abandoned(company):
+            # 不可重試的錯誤，逾時後不再重試
+            raise CrawlError("處理逾時，已放棄")
+        logger.info(f"正在爬取公司: {company.name} ({company.code or '無代碼'})")
+
+        with self._browser_lock:
+            if self.driver and "index" not in self.driver.current_url:
+                self.driver.get(self.url)
+                self._wait_for_index()
+
+        records = self.search_company(company, periods)
+        if not records:
+            raise NoDataError("未能獲取有效數據")
+        # 財報文字轉為數值（千元 / %）；每家公司只有幾筆，逐筆轉換比建立 DataFrame 快得多
+        for record in records:
+            normalize_record(record)
+        if not self._claim_result(company):
+            return records
+        if self.sink:
+            self.sink.write(records)
+        if self.journal:
+            for record in records:
+                self.journal.record(record, success=True)
+            # 搜尋成功但部分期間無資料，不重試，只記錄失敗
+            found = {(record.year, record.season) for record in records}
+            for year, season in periods:
+                if (year, season) not in found:
+                    self.journal.record(company.for_period(year, season), success=False,
+                                        error=f"{NO_DATA}: 查無該期財務數據")
+        return records
+
+    def close(self):
+        """釋放瀏覽器與連線資源"""
+        if self.driver:
+            if self.driver_pool:
+                self.driver_pool.release(self.driver)
+            else:
+                self.driver.quit()
+            self.driver = None
+        if self._report_executor:
+            self._report_executor.shutdown(wait=False)
+        if self.fetcher:
+            self.fetcher.close()
+        if self.journal:
+            self.journal.close()
+        if self.sink:
+            self.sink.close()
 
 if __name__ == "__main__":
     crawler = MOPSCrawler()
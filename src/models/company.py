@@ -1,37 +1,70 @@
 class Company:
-    """公司資料模型類別"""
+    """公司資料模型類別
+
+    財務欄位經 normalize_record 轉換後為數值：金額為 int（新台幣千元），
+    毛利率為 float（%），缺值為 None。
+    以 __slots__ 省去每筆資料的 __dict__；大量資料列請使用 CompanyBatch。
+    metrics 保存欄位對應中額外設定的指標（如每股盈餘），輸出時接在固定欄位之後；
+    沒有資料時為 None（需要時才建立 dict，不增加每筆資料的記憶體）。
+    完整科目不保存在資料列上：新增指標時於欄位對應加入設定，並由快取的頁面重新解析即可。
+    """
+    __slots__ = ('name', 'code', 'industry', 'year', 'season', 'annual_revenue',
+                 'gross_profit', 'gross_margin', 'profit_before_tax', 'profit_after_tax',
+                 'metrics')
+    LABELS = ('公司名稱', '公司代號', '產業類別', '年度', '季別', '年營收',
+              '毛利額', '毛利率', '稅前淨利', '稅後淨利')
+
     def __init__(self, name=None, code=None):
         """初始化公司資料"""
         self.name = name
         self.code = code
         self.industry = None
+        self.year = None
+        self.season = None
         self.annual_revenue = None
         self.gross_profit = None
         self.gross_margin = None
         self.profit_before_tax = None
         self.profit_after_tax = None
+        self.metrics = None
 
     def to_dict(self):
         """轉換為字典格式"""
-        return {
+        data = {
             '公司名稱': self.name,
             '公司代號': self.code,
             '產業類別': self.industry,
+            '年度': self.year,
+            '季別': self.season,
             '年營收': self.annual_revenue,
             '毛利額': self.gross_profit,
             '毛利率': self.gross_margin,
             '稅前淨利': self.profit_before_tax,
             '稅後淨利': self.profit_after_tax
         }
+        if self.metrics:
+            data.update(self.metrics)
+        return data
 
     @classmethod
     def from_dict(cls, data):
         """從字典創建實例"""
         company = cls(data.get('公司名稱'), data.get('公司代號'))
         company.industry = data.get('產業類別')
+        company.year = data.get('年度')
+        company.season = data.get('季別')
         company.annual_revenue = data.get('年營收')
         company.gross_profit = data.get('毛利額')
         company.gross_margin = data.get('毛利率')
         company.profit_before_tax = data.get('稅前淨利')
         company.profit_after_tax = data.get('稅後淨利')
-        return company 
\ No newline at end of file
+        company.metrics = {key: value for key, value in data.items() if key not in cls.LABELS} or None
+        return company
+
+    def for_period(self, year, season):
+        """複製公司基本資訊，建立指定期間的資料列"""
+        company = Company(self.name, self.code)
+        company.industry = self.industry
+        company.year = year
+        company.season = season
+        return company
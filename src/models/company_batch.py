@@ -0,0 +1,214 @@
+import numpy as np
+import pandas as pd
+
+from src.models.company import Company
+from src.utils.normalizer import AMOUNT_FIELDS, MARGIN_FIELDS, parse_amount, parse_margin
+
+try:
+    import pyarrow as pa
+except ImportError:  # 未安裝 pyarrow 時無法使用 to_arrow
+    pa = None
+
+# Company 屬性與輸出欄位的對應（依輸出欄位順序）
+TEXT_FIELDS = {
+    'name': '公司名稱',
+    'code': '公司代號',
+    'industry': '產業類別',
+    'year': '年度',
+    'season': '季別',
+}
+FIELDS = {**TEXT_FIELDS, 'annual_revenue': '年營收', 'gross_profit': '毛利額',
+          'gross_margin': '毛利率', 'profit_before_tax': '稅前淨利', 'profit_after_tax': '稅後淨利'}
+
+
+def _numeric_column(values, parse, dtype):
+    """轉為 (數值陣列, 缺值遮罩)；尚未正規化的文字以 parse 轉換"""
+    numbers = [v if v is None or isinstance(v, (int, float)) else parse(v) for v in values]
+    mask = np.fromiter((v is None for v in numbers), dtype=np.bool_, count=len(numbers))
+    data = np.fromiter((0 if v is None else v for v in numbers), dtype=dtype, count=len(numbers))
+    return data, mask
+
+
+class CompanyBatch:
+    """以欄為單位儲存大量公司資料列
+
+    文字欄位為 object 陣列，金額為 int64 陣列、毛利率為 float64 陣列，各自搭配缺值遮罩。
+    to_frame / to_arrow 直接沿用這些陣列（數值欄位不複製資料）。
+    額外指標（Company.metrics）以 dict 的 object 陣列保存，轉換時展開為接在後面的欄位。
+    """
+    def __init__(self, columns, length):
+        """columns: {屬性: object 陣列或 (數值陣列, 遮罩)}"""
+        self.columns = columns
+        self.length = length
+
+    @classmethod
+    def from_companies(cls, companies):
+        """由 Company 清單建立"""
+        companies = list(companies)
+        return cls.from_columns(
+            {attr: [getattr(company, attr) for company in companies] for attr in (*FIELDS, 'metrics')},
+            len(companies)
+        )
+
+    @classmethod
+    def from_records(cls, records):
+        """由 to_dict() 格式的資料列建立"""
+        records = list(records)
+        labels = set(FIELDS.values())
+        values = {attr: [record.get(label) for record in records] for attr, label in FIELDS.items()}
+        values['metrics'] = [
+            {key: value for key, value in record.items() if key not in labels} for record in records
+        ]
+        return cls.from_columns(values, len(records))
+
+    @classmethod
+    def from_frame(cls, df):
+        """由輸出格式的 DataFrame 建立（缺少的欄位視為空值）"""
+        length = len(df)
+        columns = {}
+        for attr, label in FIELDS.items():
+            if label not in df:
+                columns[attr] = [None] * length
+            else:
+                series = df[label]
+                values = series.astype(object).where(series.notna(), None).tolist()
+                if attr in TEXT_FIELDS:
+                    values = [None if value is None else str(value) for value in values]
+                columns[attr] = values
+        extra = [column for column in df.columns if column not in set(FIELDS.values())]
+        if extra:
+            columns['metrics'] = [
+                {key: value for key, value in row.items() if not pd.isna(value)}
+                for row in df[extra].to_dict('records')
+            ]
+        return cls.from_columns(columns, length)
+
+    @classmethod
+    def from_columns(cls, values, length):
+        """由 {屬性: 值清單} 建立"""
+        columns = {}
+        for attr in FIELDS:
+            column = values.get(attr) or [None] * length
+            if attr in AMOUNT_FIELDS:
+                columns[attr] = _numeric_column(column, parse_amount, np.int64)
+            elif attr in MARGIN_FIELDS:
+                columns[attr] = _numeric_column(column, parse_margin, np.float64)
+            else:
+                array = np.empty(length, dtype=object)
+                array[:] = column
+                columns[attr] = array
+        metrics = np.empty(length, dtype=object)
+        metrics[:] = [dict(m) if m else None for m in values.get('metrics') or [None] * length]
+        columns['metrics'] = metrics
+        return cls(columns, length)
+
+    @classmethod
+    def concat(cls, batches):
+        """依序合併多個批次"""
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.from_columns({}, 0)
+        columns = {}
+        for attr in (*FIELDS, 'metrics'):
+            if attr in TEXT_FIELDS or attr == 'metrics':
+                columns[attr] = np.concatenate([batch.columns[attr] for batch in batches])
+            else:
+                columns[attr] = (
+                    np.concatenate([batch.columns[attr][0] for batch in batches]),
+                    np.concatenate([batch.columns[attr][1] for batch in batches]),
+                )
+        return cls(columns, sum(len(batch) for batch in batches))
+
+    def __len__(self):
+        return self.length
+
+    def value(self, attr, index):
+        """取得單一欄位值（缺值為 None）"""
+        column = self.columns[attr]
+        if attr in TEXT_FIELDS:
+            return column[index]
+        data, mask = column
+        return None if mask[index] else data[index].item()
+
+    def __getitem__(self, index):
+        """取得單筆資料列（建立新的 Company）"""
+        company = Company()
+        for attr in FIELDS:
+            setattr(company, attr, self.value(attr, index))
+        metrics = self.columns['metrics'][index]
+        company.metrics = dict(metrics) if metrics else None
+        return company
+
+    def to_companies(self):
+        """轉回 Company 清單"""
+        lists = {}
+        for attr in FIELDS:
+            if attr in TEXT_FIELDS:
+                lists[attr] = self.columns[attr].tolist()
+            else:
+                data, mask = self.columns[attr]
+                lists[attr] = [None if missing else value for value, missing in zip(data.tolist(), mask.tolist())]
+        companies = []
+        for metrics, *row in zip(self.columns['metrics'], *lists.values()):
+            company = Company()
+            for attr, value in zip(FIELDS, row):
+                setattr(company, attr, value)
+            company.metrics = dict(metrics) if metrics else None
+            companies.append(company)
+        return companies
+
+    def __iter__(self):
+        return iter(self.to_companies())
+
+    def to_frame(self):
+        """轉為 DataFrame：金額為 Int64、毛利率為 Float64，數值欄位與批次共用記憶體"""
+        data = {}
+        for attr, label in FIELDS.items():
+            if attr in AMOUNT_FIELDS:
+                data[label] = pd.arrays.IntegerArray(*self.columns[attr])
+            elif attr in MARGIN_FIELDS:
+                data[label] = pd.arrays.FloatingArray(*self.columns[attr])
+            else:
+                data[label] = pd.Series(self.columns[attr], dtype=object, copy=False)
+        for name, values in self._metric_columns().items():
+            data[name] = pd.array(values)
+        return pd.DataFrame(data, copy=False)
+
+    def _metric_columns(self):
+        """將額外指標展開為 {欄名: 值清單}（依首次出現順序）"""
+        names = {}
+        for metrics in self.columns['metrics']:
+            if metrics:
+                names.update(dict.fromkeys(metrics))
+        return {name: [metrics.get(name) if metrics else None for metrics in self.columns['metrics']]
+                for name in names}
+
+    def to_arrow(self):
+        """轉為 Arrow Table：數值欄位直接引用批次的資料緩衝區"""
+        if pa is None:
+            raise ImportError("to_arrow 需要安裝 pyarrow")
+        arrays = []
+        for attr in FIELDS:
+            if attr in TEXT_FIELDS:
+                column = self.columns[attr]
+                arrays.append(pa.array(column, type=pa.string(), from_pandas=True)
+                              if len(column) else pa.array([], type=pa.string()))
+            else:
+                data, mask = self.columns[attr]
+                arrays.append(pa.array(data, mask=mask))
+        names = list(FIELDS.values())
+        for name, values in self._metric_columns().items():
+            arrays.append(pa.array(values, from_pandas=True))
+            names.append(name)
+        return pa.Table.from_arrays(arrays, names=names)
+
+    @property
+    def nbytes(self):
+        """數值陣列與遮罩佔用的位元組數（不含文字物件本身）"""
+        total = 0
+        for attr, column in self.columns.items():
+            if attr in TEXT_FIELDS or attr == 'metrics':
+                total += column.nbytes
+            else:
+                total += column[0].nbytes + column[1].nbytes
+        return total
@@ -0,0 +1,251 @@
+from collections import deque
+from collections.abc import Iterator
+from loguru import logger
+import math
+import multiprocessing
+import queue
+import sys
+import time
+
+from src.crawler import MOPSCrawler
+from src.models.company import Company
+from src.models.company_batch import CompanyBatch
+from src.utils.cache import ResponseCache
+from src.utils.company_store import CompanyMetadataStore
+from src.utils.driver import WebDriverPool
+from src.utils.file_handler import FileHandler
+from src.utils.journal import RunJournal
+from src.utils.metrics import CrawlMetrics
+from src.utils.rate_limiter import SharedRateLimiter
+from src.utils.retry import CircuitBreaker
+
+
+class _FailureLog:
+    """工作程序端的紀錄檔替身：收集失敗的期間，隨分片結果交給主程序寫入紀錄檔
+
+    成功的資料列已在批次中，由主程序記錄，這裡只保留失敗（含錯誤類型）。
+    """
+    key = staticmethod(RunJournal.key)
+
+    def __init__(self):
+        self.failures = []
+
+    def record(self, company, success, error=None):
+        if not success:
+            self.failures.append((company.to_dict(), error))
+
+    def close(self):
+        pass
+
+
+def _crawl_shard(shard_id, rows, crawler_kwargs, cache_path, metadata_path, driver_pool_size, rate_limiter,
+                 breaker, result_queue):
+    """工作程序：以自己的爬蟲與瀏覽器處理一個分片（rows 為 (公司 dict, 期間清單)）"""
+    if crawler_kwargs.get('quiet'):
+        logger.remove()
+        logger.add(sys.stderr, level='INFO')
+    tasks = [(Company.from_dict(row), periods) for row, periods in rows]
+    companies = [company for company, _ in tasks]
+    metadata = CompanyMetadataStore(metadata_path) if metadata_path else None
+    # 預熱的備用瀏覽器：重新啟動（回收、當掉）時直接借用
+    driver_pool = WebDriverPool(
+        driver_pool_size, warm_url=MOPSCrawler.INDEX_URL,
+        prewarm=crawler_kwargs.get('engine', 'selenium') == 'selenium'
+    ) if driver_pool_size else None
+    failures = _FailureLog()
+    crawler = MOPSCrawler(
+        companies=companies,
+        journal=failures,
+        rate_limiter=rate_limiter,
+        circuit_breaker=breaker,
+        cache=ResponseCache(cache_path) if cache_path else None,
+        metadata=metadata,
+        driver_pool=driver_pool,
+        **crawler_kwargs
+    )
+    try:
+        crawler.prepare()
+        records = crawler.run_tasks(tasks)
+        # 以欄式批次回傳，序列化時不需逐筆建立字典；統計資料與失敗紀錄一併交給主程序
+        result_queue.put((shard_id, CompanyBatch.from_companies(records), crawler.metrics.snapshot(),
+                          failures.failures))
+    finally:
+        crawler.close()
+        if driver_pool:
+            driver_pool.close()
+        if metadata is not None:
+            metadata.close()
+
+
+class ShardedCrawler:
+    """多程序分片爬蟲：將公司清單切成分片，由多個工作程序同時處理後合併結果"""
+    # 工作程序正常結束（exitcode 0）後，等待其結果從佇列送達的最長秒數
+    result_grace = 30
+
+    def __init__(self, workers=None, crawler_kwargs=None, cache_path=None, journal=None,
+                 resume=False, rate_limit=2.0, shard_size=None, max_shard_retries=2, companies=None,
+                 sink=None, save_excel=True, metrics=None, incremental=False, metadata_path=None,
+                 driver_pool=0):
+        """初始化分片設定
+
+        crawler_kwargs: 傳給每個工作程序 MOPSCrawler 的參數（需可序列化）
+        cache_path: 各工作程序各自開啟的 ResponseCache 檔案位置
+        metadata_path: 各工作程序共用的 CompanyMetadataStore 檔案位置（公司基本資料只需查詢一次）
+        driver_pool: 每個工作程序的 WebDriverPool 大小（0 表示不使用連線池，直接啟動瀏覽器）
+        rate_limit: 所有工作程序合計的每秒請求上限
+        shard_size: 每個分片的公司數，預設讓每個工作程序平均分到約 4 個分片
+        max_shard_retries: 工作程序異常結束時，分片重新指派的次數上限
+        companies: 公司清單或 CompanySource，預設串流讀取 data/input/company_list.xlsx
+        sink: ResultSink，由主程序在每個分片完成時寫出
+        metrics: CrawlMetrics，合併各工作程序回傳的統計資料
+        incremental: 增量更新，依紀錄檔只抓取尚未取得或可能已新公告的期間（需提供 journal，隱含 resume）
+        """
+        if incremental and journal is None:
+            raise ValueError("增量模式需要紀錄檔（journal）")
+        self.workers = workers or multiprocessing.cpu_count()
+        self.crawler_kwargs = dict(crawler_kwargs or {})
+        self.periods = list(self.crawler_kwargs.get('periods') or [('113', '04')])
+        self.crawler_kwargs['periods'] = self.periods
+        self.cache_path = cache_path
+        self.metadata_path = metadata_path
+        self.driver_pool = driver_pool
+        self.journal = journal
+        self.incremental = incremental
+        self.resume = resume or incremental
+        self.rate_limit = rate_limit
+        self.shard_size = shard_size
+        self.max_shard_retries = max_shard_retries
+        self.sink = sink
+        self.save_excel = save_excel
+        self.metrics = metrics or CrawlMetrics()
+        if companies is None:
+            companies = FileHandler.iter_company_list()
+        # 可重複迭代的來源（清單、CompanySource）保持串流，一次性的迭代器才收集為清單
+        self.companies = list(companies) if isinstance(companies, Iterator) else companies
+        self.results = []
+
+    def make_shards(self, tasks):
+        """依原始順序將 (公司, 期間) 任務切成連續的分片"""
+        if not tasks:
+            return []
+        size = self.shard_size or max(1, math.ceil(len(tasks) / (self.workers * 4)))
+        return [tasks[i:i + size] for i in range(0, len(tasks), size)]
+
+    def run_shards(self, shards):
+        """以程序池執行所有分片，回傳 {分片編號: CompanyBatch}"""
+        context = multiprocessing.get_context('spawn')
+        rate_limiter = SharedRateLimiter(self.rate_limit, context=context)
+        # 任一工作程序遇到限流，所有工作程序一起暫停
+        breaker = CircuitBreaker(context=context)
+        result_queue = context.Queue()
+        pending = deque(range(len(shards)))
+        attempts = {shard_id: 0 for shard_id in pending}
+        running = {}
+        done = {}
+
+        def collect(timeout):
+            """等待結果並清空佇列，避免其他分片的結果留在佇列中被誤判為程序異常"""
+            try:
+                item = result_queue.get(timeout=timeout)
+            except queue.Empty:
+                return
+            while True:
+                accept(*item)
+                try:
+                    item = result_queue.get_nowait()
+                except queue.Empty:
+                    return
+
+        def accept(shard_id, batch, snapshot, failures):
+            if shard_id in done:
+                # 重新指派後原程序的結果晚到：已寫入過，忽略以免重複
+                logger.warning(f"分片 {shard_id + 1} 的結果重複送達，忽略")
+                return
+            done[shard_id] = batch
+            self.metrics.merge(snapshot)
+            self.metrics.inc('shards_total', status='success')
+            self.metrics.flush()
+            # 分片完成即寫入紀錄檔與輸出，主程序中斷時可續跑
+            records = batch.to_companies()
+            if self.journal:
+                for record in records:
+                    self.journal.record(record, success=True)
+                # 查無資料與失敗的期間也要記錄，增量模式才能依錯誤類型決定何時再查
+                for data, error in failures:
+                    self.journal.record(Company.from_dict(data), success=False, error=error)
+            if self.sink:
+                self.sink.write(records)
+            logger.info(f"分片 {shard_id + 1}/{len(shards)} 完成，取得 {len(batch)} 筆")
+
+        while pending or running:
+            while pending and len(running) < self.workers:
+                shard_id = pending.popleft()
+                attempts[shard_id] += 1
+                rows = [(company.to_dict(), periods) for company, periods in shards[shard_id]]
+                process = context.Process(
+                    target=_crawl_shard,
+                    args=(shard_id, rows, self.crawler_kwargs, self.cache_path, self.metadata_path,
+                          self.driver_pool, rate_limiter, breaker, result_queue),
+                    daemon=True
+                )
+                process.start()
+                running[shard_id] = process
+
+            collect(timeout=1)
+            for shard_id, process in list(running.items()):
+                if shard_id in done:
+                    process.join()
+                    del running[shard_id]
+                elif not process.is_alive():
+                    # 程序結束前送出的結果可能還在佇列中：先清空佇列再判斷
+                    collect(timeout=0.5)
+                    if process.exitcode == 0:
+                        # 正常結束代表結果已送出，等它從管線送達，不視為異常
+                        deadline = time.monotonic() + self.result_grace
+                        while shard_id not in done and time.monotonic() < deadline:
+                            collect(timeout=1)
+                    if shard_id in done:
+                        process.join()
+                        del running[shard_id]
+                        continue
+                    del running[shard_id]
+                    self.metrics.inc('retries_total', scope='shard')
+                    if attempts[shard_id] <= self.max_shard_retries:
+                        logger.warning(f"分片 {shard_id + 1} 的工作程序未送回結果（exitcode={process.exitcode}），重新指派")
+                        pending.append(shard_id)
+                    else:
+                        logger.error(f"分片 {shard_id + 1} 已達重試上限，放棄")
+                        self.metrics.inc('shards_total', status='failed')
+        return done
+
+    def crawl_all_companies(self):
+        """分片爬取所有公司並依原始順序合併結果"""
+        if self.incremental:
+            self.journal.compact()
+        # 分片需要知道任務總數，此處將任務串流收集為清單（只含需要抓取的公司）
+        tasks = list(MOPSCrawler.build_tasks(self.companies, self.periods, self.journal, self.resume,
+                                             self.incremental))
+        shards = self.make_shards(tasks)
+        logger.info(f"共 {len(tasks)} 家公司，切成 {len(shards)} 個分片，使用 {self.workers} 個工作程序")
+
+        if self.journal:
+            self.journal.start(self.resume)
+        try:
+            done = self.run_shards(shards)
+        finally:
+            if self.journal:
+                self.journal.close()
+            if self.sink:
+                self.sink.close()
+
+        # 依分片編號合併，分片內保持原始順序，結果與單程序執行一致
+        records = CompanyBatch.concat(done[shard_id] for shard_id in sorted(done)).to_companies()
+        if self.journal:
+            self.results = self.journal.results(
+                MOPSCrawler.journal_keys(self.journal, self.companies, self.periods)
+            )
+        else:
+            self.results = records
+        if self.save_excel:
+            FileHandler.save_results(self.results)
+        return self.results
@@ -0,0 +1,158 @@
+from loguru import logger
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from src.utils.periods import is_closed_period
+
+
+class ResponseCache:
+    """原始頁面的磁碟快取（SQLite + zlib 壓縮）
+
+    以 (報表類型, 公司代號, 年度, 季別) 為鍵；已結束期間的 TTL 較長，
+    當期資料的 TTL 較短；總大小超過上限時依最近存取時間（LRU）淘汰。
+    總大小以累計值維護，寫入時不需掃描整個資料表；每 resync_every 次寫入
+    （或即將淘汰時）重新加總一次，納入其他工作程序寫入的資料。
+    淘汰時一次降到上限的 evict_ratio，避免在上限附近每次寫入都觸發淘汰。
+    """
+    resync_every = 1000
+    evict_ratio = 0.9
+
+    def __init__(self, path='data/cache/responses.sqlite3', closed_ttl=365 * 86400,
+                 current_ttl=6 * 3600, max_bytes=512 * 1024 * 1024):
+        """初始化快取（ttl 單位為秒，None 表示永不過期）"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.closed_ttl = closed_ttl
+        self.current_ttl = current_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 多個工作程序可能同時寫入同一個快取檔
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                report_type TEXT NOT NULL,
+                co_id TEXT NOT NULL,
+                year TEXT NOT NULL,
+                season TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (report_type, co_id, year, season)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+        self._conn.commit()
+        self._total = self._sum_size()
+        self._puts = 0
+
+    def _sum_size(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def ttl_for(self, year, season):
+        """依期間決定 TTL；不分期間的頁面（如公司基本資料）視為已結束期間"""
+        if not year or not season or is_closed_period(year, season):
+            return self.closed_ttl
+        return self.current_ttl
+
+    def get(self, report_type, co_id, year='', season=''):
+        """讀取快取，未命中或已過期時回傳 None"""
+        key = (report_type, str(co_id), str(year or ''), str(season or ''))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, created_at FROM responses "
+                "WHERE report_type=? AND co_id=? AND year=? AND season=?", key
+            ).fetchone()
+            ttl = self.ttl_for(key[2], key[3])
+            now = time.time()
+            if row is None or (ttl is not None and now - row[1] > ttl):
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at=? "
+                "WHERE report_type=? AND co_id=? AND year=? AND season=?", (now,) + key
+            )
+            self._conn.commit()
+            self.hits += 1
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def put(self, report_type, co_id, html, year='', season=''):
+        """寫入快取並視需要淘汰舊資料"""
+        body = zlib.compress(html.encode('utf-8'))
+        now = time.time()
+        key = (report_type, str(co_id), str(year or ''), str(season or ''))
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE report_type=? AND co_id=? AND year=? AND season=?", key
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                key + (body, len(body), now, now)
+            )
+            self._total += len(body) - (old[0] if old else 0)
+            self._puts += 1
+            if self._puts % self.resync_every == 0:
+                self._total = self._sum_size()
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """總大小超過上限時，刪除最久未存取的資料"""
+        if not self.max_bytes or self._total <= self.max_bytes:
+            return
+        # 累計值可能與實際不同（其他程序也會寫入或淘汰），淘汰前重新加總
+        self._total = self._sum_size()
+        if self._total <= self.max_bytes:
+            return
+        target = self.max_bytes * self.evict_ratio
+        evicted = 0
+        while self._total > target:
+            rows = self._conn.execute(
+                "SELECT rowid, size FROM responses ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for rowid, size in rows:
+                if self._total <= target:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE rowid=?", (rowid,))
+                self._total -= size
+                evicted += 1
+        logger.debug(f"快取超過上限，已淘汰 {evicted} 筆")
+
+    def entries(self, report_type=None):
+        """逐筆讀出快取內容 (報表類型, 公司代號, 年度, 季別, HTML)，不更新存取時間"""
+        query = "SELECT report_type, co_id, year, season, body FROM responses"
+        params = ()
+        if report_type:
+            query += " WHERE report_type=?"
+            params = (report_type,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for report, co_id, year, season, body in rows:
+            yield report, co_id, year, season, zlib.decompress(body).decode('utf-8')
+
+    def stats(self):
+        """回傳命中統計"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': count,
+            'bytes': total,
+        }
+
+    def close(self):
+        """關閉資料庫連線"""
+        with self._lock:
+            self._conn.close()
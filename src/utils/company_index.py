@@ -0,0 +1,142 @@
+from loguru import logger
+import io
+import os
+import re
+import time
+import unicodedata
+import pandas as pd
+import requests
+
+# 上市、上櫃公司基本資料（公開資訊觀測站 OpenData）
+MASTER_LIST_URLS = {
+    '上市': 'https://mopsfin.twse.com.tw/opendata/t187ap03_L.csv',
+    '上櫃': 'https://mopsfin.twse.com.tw/opendata/t187ap03_O.csv',
+}
+
+# OpenData 的「產業別」為代碼，轉換為 MOPS 頁面上的產業類別名稱
+INDUSTRY_CODES = {
+    '01': '水泥工業', '02': '食品工業', '03': '塑膠工業', '04': '紡織纖維',
+    '05': '電機機械', '06': '電器電纜', '08': '玻璃陶瓷', '09': '造紙工業',
+    '10': '鋼鐵工業', '11': '橡膠工業', '12': '汽車工業', '14': '建材營造業',
+    '15': '航運業', '16': '觀光餐旅', '17': '金融保險業', '18': '貿易百貨業',
+    '19': '綜合', '20': '其他業', '21': '化學工業', '22': '生技醫療業',
+    '23': '油電燃氣業', '24': '半導體業', '25': '電腦及週邊設備業', '26': '光電業',
+    '27': '通信網路業', '28': '電子零組件業', '29': '電子通路業', '30': '資訊服務業',
+    '31': '其他電子業', '32': '文化創意業', '33': '農業科技業', '34': '電子商務',
+    '35': '綠能環保', '36': '數位雲端', '37': '運動休閒', '38': '居家生活',
+    '80': '管理股票', '91': '存託憑證',
+}
+
+# 比對名稱時移除的公司型態字樣（由長到短，可能疊加，如「(股)公司」）
+_NAME_SUFFIXES = ('股份有限公司', '有限公司', '(股)', '公司')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_name(name):
+    """正規化公司名稱：全形轉半形、去除空白、統一「臺/台」並移除公司型態字樣"""
+    if name is None:
+        return ''
+    text = unicodedata.normalize('NFKC', str(name))
+    text = _SPACES.sub('', text).replace('臺', '台')
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in _NAME_SUFFIXES:
+            if text.endswith(suffix) and len(text) > len(suffix):
+                text = text[:-len(suffix)]
+                stripped = True
+                break
+    return text
+
+
+def normalize_code(code):
+    """正規化公司代號：全形轉半形並去除 Excel 讀入時產生的 .0"""
+    if code is None:
+        return ''
+    text = unicodedata.normalize('NFKC', str(code)).strip()
+    if text.endswith('.0') and text[:-2].isdigit():
+        text = text[:-2]
+    return text
+
+
+class CompanyMasterIndex:
+    """上市櫃公司名錄的記憶體索引（名稱、簡稱、代號雙向查詢）"""
+    COLUMNS = ['公司代號', '公司名稱', '公司簡稱', '產業類別', '市場別']
+
+    def __init__(self, records=None):
+        """以名錄資料列（dict）建立索引"""
+        self.by_code = {}
+        self.by_name = {}
+        for record in records or []:
+            self.add(record)
+
+    def add(self, record):
+        """加入一筆名錄資料"""
+        code = normalize_code(record.get('公司代號'))
+        if not code:
+            return
+        self.by_code[code] = record
+        for key in (record.get('公司名稱'), record.get('公司簡稱')):
+            name = normalize_name(key)
+            if name:
+                self.by_name.setdefault(name, code)
+
+    def __len__(self):
+        return len(self.by_code)
+
+    def resolve(self, name):
+        """由公司名稱（或簡稱、代號）查詢公司代號，查無時回傳 None"""
+        code = normalize_code(name)
+        if code in self.by_code:
+            return code
+        return self.by_name.get(normalize_name(name))
+
+    def lookup(self, code):
+        """由公司代號取得名錄資料"""
+        return self.by_code.get(normalize_code(code))
+
+    def name_for(self, code):
+        """由公司代號取得公司名稱"""
+        record = self.lookup(code)
+        return record['公司名稱'] if record else None
+
+    @classmethod
+    def from_frame(cls, df):
+        """由 DataFrame 建立索引"""
+        df = df.fillna('')
+        return cls(df.to_dict('records'))
+
+    @staticmethod
+    def download(timeout=30):
+        """下載上市、上櫃公司名錄並整理為統一欄位"""
+        frames = []
+        for market, url in MASTER_LIST_URLS.items():
+            response = requests.get(url, timeout=timeout)
+            response.raise_for_status()
+            df = pd.read_csv(io.StringIO(response.content.decode('utf-8-sig')), dtype=str)
+            df = df.rename(columns=lambda c: c.strip())
+            df['產業類別'] = df['產業別'].map(lambda c: INDUSTRY_CODES.get(str(c).strip().zfill(2), c))
+            df['市場別'] = market
+            frames.append(df[CompanyMasterIndex.COLUMNS])
+            logger.info(f"已下載{market}公司名錄 {len(df)} 筆")
+        return pd.concat(frames, ignore_index=True)
+
+    @classmethod
+    def load(cls, snapshot_path='data/input/company_master.csv', max_age=7 * 86400, offline=False):
+        """載入名錄：本機快照未過期時直接使用，否則重新下載並更新快照"""
+        fresh = os.path.exists(snapshot_path) and time.time() - os.path.getmtime(snapshot_path) < max_age
+        if not fresh and not offline:
+            try:
+                df = cls.download()
+                os.makedirs(os.path.dirname(snapshot_path) or '.', exist_ok=True)
+                df.to_csv(snapshot_path, index=False, encoding='utf-8-sig')
+                return cls.from_frame(df)
+            except Exception as e:
+                logger.warning(f"下載公司名錄失敗，改用本機快照: {str(e)}")
+
+        if not os.path.exists(snapshot_path):
+            logger.error(f"找不到公司名錄快照 {snapshot_path}")
+            return cls()
+        df = pd.read_csv(snapshot_path, dtype=str, encoding='utf-8-sig')
+        logger.info(f"已載入公司名錄快照 {len(df)} 筆")
+        return cls.from_frame(df)
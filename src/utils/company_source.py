@@ -0,0 +1,109 @@
+from loguru import logger
+import os
+import re
+
+import pandas as pd
+
+from src.models.company import Company
+from src.utils.company_index import normalize_code
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # 未安裝 openpyxl 時 xlsx 改以 pandas 一次讀入
+    load_workbook = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # 未安裝 pyarrow 時無法讀取 Parquet
+    pq = None
+
+# 上市櫃公司代號：4~6 碼英數字（如 2330、00878、2888A）
+_CODE_PATTERN = re.compile(r'[0-9]{4}[0-9A-Z]{0,2}')
+_MISSING_CODES = {'', '查無資訊', 'NAN', 'NONE'}
+
+
+def iter_rows(file_path, chunk_size=1000):
+    """逐列讀取公司清單（xlsx/csv/parquet），以 dict 回傳，不一次載入整個檔案"""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in ('.xlsx', '.xlsm') and load_workbook is not None:
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(name).strip() if name is not None else '' for name in next(rows, ())]
+            for values in rows:
+                yield dict(zip(header, values))
+        finally:
+            workbook.close()
+    elif ext in ('.xlsx', '.xlsm', '.xls'):
+        yield from pd.read_excel(file_path, dtype=str).to_dict('records')
+    elif ext == '.csv':
+        for chunk in pd.read_csv(file_path, dtype=str, chunksize=chunk_size, encoding='utf-8-sig'):
+            yield from chunk.to_dict('records')
+    elif ext == '.parquet':
+        if pq is None:
+            raise ImportError("讀取 Parquet 需要安裝 pyarrow")
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size):
+            yield from batch.to_pylist()
+    else:
+        raise ValueError(f"不支援的公司清單格式: {ext}")
+
+
+def clean_code(value):
+    """正規化公司代號，無效時回傳 None"""
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    code = normalize_code(value).upper()
+    # 數值儲存格會遺失前導零（0050 → 50）
+    if isinstance(value, (int, float)) and code.isdigit():
+        code = code.zfill(4)
+    if code in _MISSING_CODES or not _CODE_PATTERN.fullmatch(code):
+        return None
+    return code
+
+
+class CompanySource:
+    """串流讀取公司清單：逐列正規化代號、略過無效與重複的公司，依序產生 Company
+
+    可重複迭代（每次重新讀檔），記憶體用量只與不重複的代號數有關。
+    """
+    def __init__(self, file_path='data/input/company_list.xlsx', chunk_size=1000):
+        """初始化來源檔案（副檔名決定格式：xlsx/csv/parquet）"""
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.stats = {}
+
+    def __iter__(self):
+        stats = {'rows': 0, 'valid': 0, 'invalid': 0, 'duplicates': 0}
+        self.stats = stats
+        seen = set()
+        invalid = []
+        try:
+            for row in iter_rows(self.file_path, self.chunk_size):
+                stats['rows'] += 1
+                name = row.get('公司名稱')
+                name = str(name).strip() if name is not None and name == name else ''
+                code = clean_code(row.get('公司代號'))
+                if code is None:
+                    stats['invalid'] += 1
+                    if len(invalid) < 5:
+                        invalid.append(name or f"第 {stats['rows'] + 1} 列")
+                    continue
+                if code in seen:
+                    stats['duplicates'] += 1
+                    continue
+                seen.add(code)
+                stats['valid'] += 1
+                company = Company(name or code, code)
+                industry = row.get('產業類別')
+                if industry and industry == industry:
+                    company.industry = str(industry).strip()
+                yield company
+        except FileNotFoundError:
+            logger.error(f"找不到 {self.file_path} 檔案")
+            return
+        logger.info(
+            f"公司清單 {self.file_path}：共 {stats['rows']} 列，有效 {stats['valid']} 家，"
+            f"重複 {stats['duplicates']} 列，無效代號 {stats['invalid']} 列"
+        )
+        if invalid:
+            logger.warning(f"略過無有效代號的公司（前 {len(invalid)} 筆）: {', '.join(invalid)}")
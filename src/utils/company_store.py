@@ -0,0 +1,110 @@
+from loguru import logger
+import os
+import sqlite3
+import threading
+import time
+
+from src.utils.company_index import normalize_code
+
+
+class CompanyMetadataStore:
+    """公司基本資料（名稱、產業類別、市場別）的快取，以公司代號為鍵
+
+    記憶體中保留已讀過的資料，並寫入 SQLite 供下次執行與其他工作程序使用。
+    基本資料很少變動，預設 TTL 為 180 天；可由上市櫃公司名錄一次匯入。
+    已知基本資料的公司，爬蟲不再執行搜尋步驟。
+    """
+    def __init__(self, path='data/cache/company_metadata.sqlite3', ttl=180 * 86400):
+        """初始化（ttl 單位為秒，None 表示永不過期）"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._memory = {}
+        self._lock = threading.Lock()
+        # 多個工作程序可能同時寫入同一個檔案
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS companies (
+                code TEXT PRIMARY KEY,
+                name TEXT,
+                industry TEXT,
+                market TEXT,
+                source TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def _expired(self, updated_at):
+        return self.ttl is not None and time.time() - updated_at > self.ttl
+
+    def get(self, code):
+        """取得公司基本資料 {'公司代號', '公司名稱', '產業類別', '市場別'}，未知或已過期時回傳 None"""
+        code = normalize_code(code)
+        with self._lock:
+            entry = self._memory.get(code)
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT name, industry, market, updated_at FROM companies WHERE code=?", (code,)
+                ).fetchone()
+                if row is not None:
+                    entry = self._memory[code] = ({
+                        '公司代號': code, '公司名稱': row[0], '產業類別': row[1], '市場別': row[2],
+                    }, row[3])
+            if entry is None or self._expired(entry[1]) or not entry[0]['產業類別']:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(entry[0])
+
+    def put(self, code, name=None, industry=None, market=None, source='search'):
+        """寫入單一公司的基本資料"""
+        self.put_many([(code, name, industry, market)], source)
+
+    def put_many(self, rows, source='search'):
+        """批次寫入 (代號, 名稱, 產業類別, 市場別)，回傳寫入筆數"""
+        now = time.time()
+        values = []
+        for code, name, industry, market in rows:
+            code = normalize_code(code)
+            if code:
+                values.append((code, name or None, industry or None, market or None, source, now))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO companies VALUES (?, ?, ?, ?, ?, ?)", values)
+            self._conn.commit()
+            for code, name, industry, market, _, updated_at in values:
+                self._memory[code] = ({
+                    '公司代號': code, '公司名稱': name, '產業類別': industry, '市場別': market,
+                }, updated_at)
+        return len(values)
+
+    def bulk_load(self, master_index):
+        """由 CompanyMasterIndex（上市櫃公司名錄）一次匯入所有公司，回傳匯入筆數"""
+        count = self.put_many(
+            ((code, record.get('公司名稱'), record.get('產業類別'), record.get('市場別'))
+             for code, record in master_index.by_code.items()),
+            source='master'
+        )
+        logger.info(f"已由公司名錄匯入 {count} 家公司的基本資料")
+        return count
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+
+    def stats(self):
+        """回傳命中統計"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self),
+        }
+
+    def close(self):
+        """關閉資料庫連線"""
+        with self._lock:
+            self._conn.close()
@@ -2,11 +2,32 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
+from contextlib import contextmanager
+from loguru import logger
 import platform
+import queue
+import threading
+
+try:
+    import psutil
+except ImportError:  # 未安裝 psutil 時無法量測瀏覽器記憶體，只依處理家數回收
+    psutil = None
 
 class WebDriver:
     """瀏覽器驅動工具類"""
+    _driver_path = None
+    _driver_path_lock = threading.Lock()
+
+    @classmethod
+    def driver_path(cls):
+        """取得 chromedriver 路徑（只在第一次呼叫時下載/解析）"""
+        with cls._driver_path_lock:
+            if cls._driver_path is None:
+                cls._driver_path = ChromeDriverManager().install()
+            return cls._driver_path
+
     @staticmethod
     def create_driver(headless=False):
         """創建Chrome瀏覽器驅動"""
@@ -28,12 +49,156 @@ class WebDriver:
             service = Service()
             driver = webdriver.Chrome(options=chrome_options)
         else:
-            service = Service(ChromeDriverManager().install())
+            service = Service(WebDriver.driver_path())
             driver = webdriver.Chrome(service=service, options=chrome_options)
             
         return driver
 
     @staticmethod
-    def create_wait(driver, timeout=10):
-        """創建等待物件"""
-        return WebDriverWait(driver, timeout) 
\ No newline at end of file
+    def memory_usage(driver):
+        """瀏覽器（chromedriver 及其所有 Chrome 子程序）的 RSS 合計（bytes），無法量測時回傳 None"""
+        if psutil is None:
+            return None
+        try:
+            root = psutil.Process(driver.service.process.pid)
+            total = 0
+            for process in [root] + root.children(recursive=True):
+                try:
+                    total += process.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+            return total
+        except (AttributeError, psutil.Error):
+            return None
+
+    @staticmethod
+    def create_wait(driver, timeout=10, poll_frequency=0.1):
+        """創建等待物件（預設每 0.1 秒檢查一次條件）"""
+        return WebDriverWait(driver, timeout, poll_frequency=poll_frequency) 
+
+
+class WebDriverPool:
+    """預熱的瀏覽器連線池，可由多個爬蟲或執行緒共用"""
+    def __init__(self, size=2, headless=True, warm_url=None, prewarm=True):
+        """初始化連線池
+
+        warm_url: 預熱時先開啟的頁面（例如 MOPS 首頁），借出時已載入完成
+        """
+        self.size = size
+        self.headless = headless
+        self.warm_url = warm_url
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        if prewarm:
+            self.prewarm()
+
+    def _create(self):
+        """建立並預熱一個瀏覽器"""
+        driver = WebDriver.create_driver(headless=self.headless)
+        if self.warm_url:
+            try:
+                driver.get(self.warm_url)
+                WebDriver.create_wait(driver).until(
+                    lambda d: d.execute_script('return document.readyState') == 'complete'
+                )
+            except Exception as e:
+                logger.warning(f"預熱瀏覽器時出錯: {str(e)}")
+        return driver
+
+    def prewarm(self):
+        """將連線池補滿預熱的瀏覽器"""
+        while True:
+            with self._lock:
+                if self._created >= self.size:
+                    return
+                self._created += 1
+            try:
+                self._idle.put(self._create())
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+    def is_healthy(self, driver):
+        """檢查瀏覽器是否仍可使用（分頁已當掉變成空白頁、或停在錯誤頁面時視為異常）"""
+        try:
+            url = driver.current_url
+            driver.window_handles
+        except Exception:
+            return False
+        if not url or url == 'about:blank' or 'autoAction' in url:
+            return False
+        return True
+
+    def _discard(self, driver):
+        """關閉瀏覽器並釋出名額"""
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def acquire(self, timeout=None):
+        """借出一個可用的瀏覽器，必要時重新建立"""
+        if self._closed:
+            raise RuntimeError("連線池已關閉")
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        return self._create()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                driver = self._idle.get(timeout=timeout)
+
+            if self.is_healthy(driver):
+                return driver
+            logger.warning("瀏覽器狀態異常，重新建立")
+            self._discard(driver)
+
+    def release(self, driver, discard=False):
+        """歸還瀏覽器；discard=True 或狀態異常時直接回收"""
+        if discard or self._closed or not self.is_healthy(driver):
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+    @contextmanager
+    def session(self, timeout=None):
+        """以 with 語法借用瀏覽器"""
+        driver = self.acquire(timeout)
+        discard = False
+        try:
+            yield driver
+        except WebDriverException:
+            discard = True
+            raise
+        finally:
+            self.release(driver, discard)
+
+    def close(self):
+        """關閉連線池內所有閒置的瀏覽器"""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
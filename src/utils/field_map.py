@@ -0,0 +1,68 @@
+import unicodedata
+
+# 損益表欄位對應：欄位 → (會計科目名稱（依優先順序）, 取值欄)
+# 取值欄 'value' 為本期金額，'percent' 為本期百分比。
+# 鍵為 Company 屬性時寫入該屬性，其他鍵（如「每股盈餘」）寫入 Company.metrics 並作為輸出欄名。
+INCOME_FIELD_MAP = {
+    'annual_revenue': (('營業收入合計', '收益合計', '淨收益'), 'value'),
+    'gross_profit': (('營業毛利（毛損）淨額', '營業毛利（毛損）'), 'value'),
+    'gross_margin': (('營業毛利（毛損）淨額', '營業毛利（毛損）'), 'percent'),
+    'profit_before_tax': (('稅前淨利（淨損）', '繼續營業單位稅前淨利（淨損）'), 'value'),
+    'profit_after_tax': (('本期淨利（淨損）', '繼續營業單位本期淨利（淨損）'), 'value'),
+    '營業利益': (('營業利益（損失）',), 'value'),
+    '研發費用': (('研究發展費用',), 'value'),
+    '每股盈餘': (('基本每股盈餘', '基本每股盈餘合計'), 'value'),
+}
+
+# 資產負債表（ajax_t164sb03）欄位對應
+BALANCE_FIELD_MAP = {
+    '資產總額': (('資產總計', '資產總額', '資產合計'), 'value'),
+    '負債總額': (('負債總計', '負債總額', '負債合計'), 'value'),
+    '權益總額': (('權益總計', '權益總額', '權益合計'), 'value'),
+    '現金及約當現金': (('現金及約當現金',), 'value'),
+}
+
+# 現金流量表（ajax_t164sb05）欄位對應
+CASH_FLOW_FIELD_MAP = {
+    '營業現金流': (('營業活動之淨現金流入（流出）',), 'value'),
+    '投資現金流': (('投資活動之淨現金流入（流出）',), 'value'),
+    '籌資現金流': (('籌資活動之淨現金流入（流出）',), 'value'),
+}
+
+# 取值欄為 'value' 但數值帶小數（元／股）的欄位，輸出為 float64；其他 'value' 欄位為金額（int64）
+DECIMAL_FIELDS = {'每股盈餘'}
+
+_COLUMNS = {'value': 0, 'percent': 1}
+
+
+def normalize_title(title):
+    """正規化會計科目名稱：全形轉半形並去除所有空白（含 &nbsp;）"""
+    return ''.join(unicodedata.normalize('NFKC', title).split())
+
+
+class FieldIndex:
+    """由欄位對應預先建立的科目名稱索引
+
+    建立時即正規化所有科目名稱，之後每個欄位只需依優先順序做字典查詢，
+    新增欄位不會增加解析次數。
+    """
+    def __init__(self, field_map=None):
+        """field_map: {欄位: (科目名稱清單, 'value' 或 'percent')}"""
+        self.field_map = dict(INCOME_FIELD_MAP if field_map is None else field_map)
+        self.lookups = []
+        for field, (titles, column) in self.field_map.items():
+            if column not in _COLUMNS:
+                raise ValueError(f"未知的取值欄 {column}，可用值: value, percent")
+            keys = tuple(normalize_title(title) for title in titles)
+            self.lookups.append((field, keys, _COLUMNS[column]))
+
+    def extract(self, line_items):
+        """由 {正規化科目名稱: [本期金額, 本期百分比, ...]} 取出各欄位的值"""
+        values = {}
+        for field, keys, column in self.lookups:
+            for key in keys:
+                cells = line_items.get(key)
+                if cells is not None and len(cells) > column and cells[column]:
+                    values[field] = cells[column]
+                    break
+        return values
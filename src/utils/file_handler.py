@@ -1,25 +1,26 @@
 import os
 import pandas as pd
 from loguru import logger
-from src.models.company import Company
+from src.models.company_batch import CompanyBatch
+from src.utils.company_source import CompanySource
+from src.utils.normalizer import normalize_frame
 
 class FileHandler:
     """檔案處理工具類"""
     @staticmethod
     def read_company_list(file_path='data/input/company_list.xlsx'):
-        """從Excel檔案讀取公司列表"""
+        """從Excel/CSV/Parquet檔案讀取公司列表（已正規化代號並去除無效與重複的公司）"""
         try:
-            df = pd.read_excel(file_path)
-            companies = df.to_dict('records')
-            logger.info(f"成功讀取了 {len(companies)} 家公司的資訊")
-            return [Company.from_dict(company) for company in companies]
-        except FileNotFoundError:
-            logger.error(f"找不到 {file_path} 檔案")
-            return []
+            return list(CompanySource(file_path))
         except Exception as e:
             logger.error(f"讀取公司列表時出錯: {str(e)}")
             return []
 
+    @staticmethod
+    def iter_company_list(file_path='data/input/company_list.xlsx', chunk_size=1000):
+        """串流讀取公司列表，回傳可重複迭代的 CompanySource（不一次載入整個檔案）"""
+        return CompanySource(file_path, chunk_size)
+
     @staticmethod
     def save_results(results, output_path='data/output/results.xlsx'):
         """保存爬取結果"""
@@ -28,16 +29,8 @@ class FileHandler:
                 logger.warning("沒有數據可保存")
                 return
 
-            # 將Company物件轉換為字典
-            data = [company.to_dict() for company in results]
-            
-            # 創建DataFrame
-            df = pd.DataFrame(data)
-            
-            # 調整列順序
-            columns_order = ['公司名稱', '公司代號', '產業類別', '年營收', 
-                           '毛利額', '毛利率', '稅前淨利', '稅後淨利']
-            df = df[columns_order]
+            # 以欄式批次建立DataFrame（欄位順序與輸出格式一致），不逐筆建立字典
+            df = CompanyBatch.from_companies(results).to_frame()
             
             # 確保輸出目錄存在
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -47,4 +40,14 @@ class FileHandler:
             logger.success(f"結果已保存至: {output_path}")
             
         except Exception as e:
-            logger.error(f"保存結果時出錯: {str(e)}") 
\ No newline at end of file
+            logger.error(f"保存結果時出錯: {str(e)}") 
+
+    @staticmethod
+    def read_results(file_path='data/output/results.xlsx'):
+        """讀取既有的結果檔，並將金額與毛利率欄位轉為數值型別"""
+        try:
+            df = pd.read_excel(file_path, dtype={'公司代號': str, '年度': str, '季別': str})
+            return normalize_frame(df)
+        except FileNotFoundError:
+            logger.error(f"找不到 {file_path} 檔案")
+            return pd.DataFrame()
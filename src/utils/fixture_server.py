@@ -0,0 +1,188 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import argparse
+import os
+import random
+import threading
+import time
+
+NO_DATA_PAGE = "<html><body><center><h3>查詢無資料</h3></center></body></html>"
+ERROR_PAGE = "<html><body><h3>Service Unavailable</h3></body></html>"
+
+
+def fixture_name(co_id, year=None, season=None):
+    """頁面檔名：有期間時為 {代號}_{年度}_{季別}.html，否則為 {代號}.html"""
+    if year and season:
+        return f"{co_id}_{year}_{season}.html"
+    return f"{co_id}.html"
+
+
+class FixtureRecorder:
+    """錄製器：將實際回應頁面存成替身伺服器可讀取的檔案"""
+    def __init__(self, fixture_dir='data/fixtures'):
+        """初始化錄製目錄"""
+        self.fixture_dir = fixture_dir
+        self.saved = 0
+        self._lock = threading.Lock()
+
+    def save(self, endpoint, co_id, html, year=None, season=None):
+        """儲存一個頁面，回傳檔案路徑"""
+        directory = os.path.join(self.fixture_dir, endpoint)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, fixture_name(co_id, year, season))
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(html)
+        with self._lock:
+            self.saved += 1
+        return path
+
+    def export_cache(self, cache):
+        """將 ResponseCache 中的 MOPS 頁面匯出為測試頁面（瀏覽器引擎的執行結果也可錄製）"""
+        count = 0
+        for endpoint, co_id, year, season, html in cache.entries():
+            if endpoint.startswith('ajax_'):
+                self.save(endpoint, co_id, html, year, season)
+                count += 1
+        return count
+
+
+class FixtureServer:
+    """本機替身伺服器：以錄製好的頁面模擬 MOPS 回應
+
+    latency/jitter 模擬網路延遲（秒），error_rate 為回應 HTTP 503 的比例，
+    可用於離線測試重試機制與效能。
+    """
+    def __init__(self, fixture_dir='data/fixtures', host='127.0.0.1', port=0,
+                 latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        """初始化伺服器"""
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        """伺服器根網址，可直接傳給 HttpFetcher(base_url=...)"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def find_fixture(self, endpoint, form):
+        """依端點與表單欄位尋找對應的頁面檔案"""
+        co_id = form.get('co_id', '')
+        candidates = []
+        if form.get('year') and form.get('season'):
+            candidates.append(fixture_name(co_id, form['year'], form['season']))
+        candidates.append(fixture_name(co_id))
+        for name in candidates:
+            path = os.path.join(self.fixture_dir, endpoint, name)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def codes(self):
+        """測試頁面中出現的公司代號"""
+        codes = set()
+        for endpoint in os.listdir(self.fixture_dir):
+            directory = os.path.join(self.fixture_dir, endpoint)
+            if os.path.isdir(directory):
+                codes.update(name.split('_')[0].split('.')[0] for name in os.listdir(directory))
+        return sorted(codes)
+
+    def _simulate(self):
+        """依設定延遲，回傳此次請求是否模擬錯誤"""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._random.uniform(0, self.jitter) if self.jitter else self.latency
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if delay > 0:
+            time.sleep(delay)
+        return failed
+
+    def _make_handler(self):
+        """建立請求處理類別"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8')
+                form = {key: values[0] for key, values in parse_qs(body).items()}
+                if server._simulate():
+                    self._send(503, ERROR_PAGE.encode('utf-8'))
+                    return
+                self._respond(server.find_fixture(self.path.rsplit('/', 1)[-1], form))
+
+            def do_GET(self):
+                self._respond(None)
+
+            def _respond(self, path):
+                if path:
+                    with open(path, 'rb') as f:
+                        content = f.read()
+                else:
+                    content = NO_DATA_PAGE.encode('utf-8')
+                self._send(200, content)
+
+            def _send(self, status, content):
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """於背景執行緒啟動伺服器"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """停止伺服器"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MOPS 本機替身伺服器")
+    parser.add_argument('--fixture-dir', default='data/fixtures', help="測試頁面目錄")
+    parser.add_argument('--port', type=int, default=8000, help="監聽埠號")
+    parser.add_argument('--latency', type=float, default=0.0, help="每個請求的固定延遲（秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="額外的隨機延遲上限（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="回應 HTTP 503 的比例（0~1）")
+    parser.add_argument('--export-cache', default=None,
+                        help="先將指定的快取檔匯出為測試頁面（例如 data/cache/responses.sqlite3）")
+    args = parser.parse_args()
+
+    if args.export_cache:
+        from src.utils.cache import ResponseCache
+        count = FixtureRecorder(args.fixture_dir).export_cache(ResponseCache(args.export_cache))
+        print(f"已由快取匯出 {count} 個測試頁面")
+
+    server = FixtureServer(args.fixture_dir, port=args.port, latency=args.latency,
+                           jitter=args.jitter, error_rate=args.error_rate)
+    print(f"替身伺服器已啟動: {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
@@ -0,0 +1,129 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from loguru import logger
+
+from src.utils.retry import ThrottledError, is_blocked_page
+
+
+class HttpFetcher:
+    """HTTP 抓取工具類（直接送出表單，不需開啟瀏覽器）"""
+    BASE_URL = "https://mopsov.twse.com.tw"
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+        'Referer': 'https://mopsov.twse.com.tw/mops/web/index',
+        'Content-Type': 'application/x-www-form-urlencoded',
+    }
+
+    def __init__(self, base_url=None, pool_size=10, timeout=15, rate_limiter=None, cache=None,
+                 recorder=None, metrics=None):
+        """初始化連線設定
+
+        rate_limiter: HostRateLimiter，可在多執行緒間共用
+        cache: ResponseCache，命中時不發送請求
+        recorder: FixtureRecorder，將實際回應存成離線測試頁面
+        metrics: CrawlMetrics，記錄快取命中與請求結果
+        """
+        self.base_url = (base_url or self.BASE_URL).rstrip('/')
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.recorder = recorder
+        self.metrics = metrics
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """取得目前執行緒專用的連線池 Session"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(self.HEADERS)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def post_form(self, path, data):
+        """送出表單並回傳 HTML 字串；被網站限流時拋出 ThrottledError"""
+        url = f"{self.base_url}{path}"
+        if self.rate_limiter:
+            self.rate_limiter.acquire(url)
+        response = self.session.post(url, data=data, timeout=self.timeout)
+        if self.metrics:
+            self.metrics.inc('http_responses_total', code=response.status_code)
+        if response.status_code == 429:
+            raise ThrottledError(f"HTTP 429: {url}")
+        response.raise_for_status()
+        # MOPS 回應未必帶 charset，requests 會誤判為 ISO-8859-1
+        if not response.encoding or response.encoding.lower() == 'iso-8859-1':
+            response.encoding = 'utf-8'
+        if is_blocked_page(response.text):
+            raise ThrottledError(f"網站阻擋查詢: {url}")
+        return response.text
+
+    @staticmethod
+    def build_form(co_id, year=None, season=None):
+        """組出與 document.fm1 相同的表單欄位"""
+        form = {
+            'encodeURIComponent': '1',
+            'step': '1',
+            'firstin': '1',
+            'off': '1',
+            'queryName': 'co_id',
+            'inpuType': 'co_id',
+            'TYPEK': 'all',
+            'isnew': 'false',
+            'co_id': co_id,
+        }
+        if year is not None:
+            form['year'] = year
+        if season is not None:
+            form['season'] = season
+        return form
+
+    @staticmethod
+    def is_cacheable(html):
+        """只快取含資料表格（hasBorder）的頁面；查無資料、錯誤、維護或被網站阻擋的頁面不寫入快取"""
+        return bool(html) and 'hasBorder' in html and not is_blocked_page(html)
+
+    def fetch_page(self, endpoint, co_id, year=None, season=None):
+        """抓取指定端點的頁面，優先讀取快取"""
+        if self.cache:
+            html = self.cache.get(endpoint, co_id, year, season)
+            if self.metrics:
+                self.metrics.inc('cache_requests_total', result='hit' if html is not None else 'miss')
+            if html is not None:
+                logger.debug(f"快取命中: {endpoint} {co_id} {year or ''}{season or ''}")
+                return html
+        html = self.post_form(f'/mops/web/{endpoint}', self.build_form(co_id, year, season))
+        if self.is_cacheable(html):
+            if self.cache:
+                self.cache.put(endpoint, co_id, html, year, season)
+            if self.recorder:
+                self.recorder.save(endpoint, co_id, html, year, season)
+        return html
+
+    def fetch_income_statement(self, co_id, year='113', season='04'):
+        """抓取綜合損益表（ajax_t164sb04）"""
+        logger.debug(f"HTTP 抓取綜合損益表: {co_id} {year}Q{season}")
+        return self.fetch_page('ajax_t164sb04', co_id, year, season)
+
+    def fetch_company_profile(self, co_id):
+        """抓取公司基本資料（ajax_t05st03）"""
+        logger.debug(f"HTTP 抓取公司基本資料: {co_id}")
+        return self.fetch_page('ajax_t05st03', co_id)
+
+    def close(self):
+        """關閉所有連線"""
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+        self._local = threading.local()
@@ -0,0 +1,99 @@
+from loguru import logger
+import json
+import os
+import threading
+import time
+
+from src.models.company import Company
+
+
+class RunJournal:
+    """爬取紀錄檔（append-only JSONL），每家公司完成即寫入一行"""
+    def __init__(self, path='data/output/journal.jsonl'):
+        """初始化紀錄檔位置"""
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    @staticmethod
+    def key(company, year=None, season=None):
+        """紀錄鍵值：公司代號（無代號時用名稱）加上期間"""
+        code = company.code if company.code and company.code != '查無資訊' else None
+        year = year or company.year
+        season = season or company.season
+        base = str(code or company.name)
+        return f"{base}|{year}{season}" if year and season else base
+
+    def start(self, resume=False):
+        """開啟紀錄檔；非續跑模式會先將舊紀錄改名保留"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if not resume and os.path.exists(self.path):
+            os.replace(self.path, self.path + '.prev')
+        self._file = open(self.path, 'a', encoding='utf-8')
+        return self
+
+    def record(self, company, success, error=None):
+        """寫入單一公司（單一期間）的結果並立即落盤"""
+        entry = {
+            'key': self.key(company),
+            'status': 'success' if success else 'failed',
+            'data': company.to_dict(),
+            'error': error,
+            'ts': time.time(),
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def load(self):
+        """讀取紀錄檔，回傳 {鍵值: 最後一筆紀錄}"""
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 當機時最後一行可能寫到一半
+                    logger.warning(f"略過紀錄檔第 {line_no} 行（格式不完整）")
+                    continue
+                entries[entry['key']] = entry
+        return entries
+
+    def compact(self):
+        """每個鍵值只保留最後一筆紀錄，重寫紀錄檔（增量模式每次執行前呼叫，避免紀錄檔無限增長）"""
+        entries = self.load()
+        if not entries:
+            return 0
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            for entry in entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(self.path + '.tmp', self.path)
+        return len(entries)
+
+    def completed_keys(self):
+        """已成功完成的公司鍵值"""
+        return {key for key, entry in self.load().items() if entry['status'] == 'success'}
+
+    def results(self, keys=None):
+        """由紀錄檔組出成功的結果；提供 keys 時依其順序排列"""
+        entries = self.load()
+        keys = list(entries) if keys is None else list(dict.fromkeys(keys))
+        return [
+            Company.from_dict(entries[key]['data'])
+            for key in keys
+            if key in entries and entries[key]['status'] == 'success'
+        ]
+
+    def close(self):
+        """關閉紀錄檔"""
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,326 @@
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+# 延遲直方圖的分界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    text = ','.join(f'{name}="{str(value)}"'.replace('\n', ' ') for name, value in pairs)
+    return '{' + text + '}'
+
+
+class Histogram:
+    """累積分桶直方圖（與 Prometheus histogram 相同的語意）"""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """由分桶估計分位數（取所在分桶的上界）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other['counts'])]
+        self.count += other['count']
+        self.sum += other['sum']
+
+    def snapshot(self):
+        return {'counts': list(self.counts), 'count': self.count, 'sum': self.sum}
+
+
+class CrawlMetrics:
+    """爬取過程的計數器、延遲直方圖與追蹤 span
+
+    計數器與直方圖可輸出為 Prometheus 文字格式（檔案或 HTTP 端點），
+    span 依執行緒記錄父子關係（公司 → 抓取/解析等階段），與統計一併寫入 JSON 報告。
+    """
+    def __init__(self, prefix='mops', buckets=DEFAULT_BUCKETS, prometheus_path=None,
+                 flush_interval=10, max_spans=100000):
+        """初始化
+
+        prometheus_path: 執行中定期寫出的 Prometheus 文字檔（至多每 flush_interval 秒一次）
+        max_spans: 保留的 span 數上限，超過後只計數不保存
+        """
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.prometheus_path = prometheus_path
+        self.flush_interval = flush_interval
+        self.max_spans = max_spans
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.spans = []
+        self.dropped_spans = 0
+        self.started = time.time()
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._flushed = 0.0
+        self._server = None
+
+    def inc(self, name, value=1, **labels):
+        """計數器加值"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """設定量測值（例如瀏覽器記憶體），保留最新一次"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.gauges[key] = value
+
+    def observe(self, name, seconds, **labels):
+        """記錄一次延遲（秒）"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """追蹤一段處理；巢狀呼叫時自動以外層 span 為父節點"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        parent = stack[-1] if stack else None
+        span = {
+            'trace_id': parent['trace_id'] if parent else uuid.uuid4().hex[:16],
+            'span_id': next(self._ids),
+            'parent_id': parent['span_id'] if parent else None,
+            'name': name,
+            'start': time.time(),
+            'attrs': attrs,
+            'status': 'ok',
+        }
+        stack.append(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span['status'] = 'error'
+            span['error'] = str(e)
+            raise
+        finally:
+            span['duration'] = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                if len(self.spans) < self.max_spans:
+                    self.spans.append(span)
+                else:
+                    self.dropped_spans += 1
+
+    def current_span(self):
+        """目前執行緒最內層的 span（沒有時回傳 None）"""
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def attach(self, parent):
+        """在其他執行緒中延續 parent span，之後建立的 span 以它為父節點"""
+        if parent is None:
+            yield
+            return
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(parent)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    def snapshot(self):
+        """可序列化的統計內容（供工作程序回傳主程序合併）"""
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'gauges': [[name, list(labels), value] for (name, labels), value in self.gauges.items()],
+                'histograms': [[name, list(labels), h.snapshot()] for (name, labels), h in self.histograms.items()],
+                'spans': list(self.spans),
+                'dropped_spans': self.dropped_spans,
+            }
+
+    def merge(self, snapshot):
+        """合併其他程序的統計內容"""
+        with self._lock:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                self.counters[key] = self.counters.get(key, 0) + value
+            # 各程序的量測值取最大值（例如最大的瀏覽器記憶體）
+            for name, labels, value in snapshot.get('gauges', []):
+                key = (name, tuple(tuple(pair) for pair in labels))
+                self.gauges[key] = max(self.gauges.get(key, value), value)
+            for name, labels, data in snapshot['histograms']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram(self.buckets)
+                histogram.merge(data)
+            room = max(0, self.max_spans - len(self.spans))
+            self.spans.extend(snapshot['spans'][:room])
+            self.dropped_spans += snapshot['dropped_spans'] + max(0, len(snapshot['spans']) - room)
+
+    def to_prometheus(self):
+        """輸出 Prometheus 文字格式"""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+            for kind, items in (('counter', counters), ('gauge', gauges)):
+                for name in sorted({name for (name, _), _ in items}):
+                    lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+                    for (metric, labels), value in items:
+                        if metric == name:
+                            lines.append(f"{self.prefix}_{name}{_format_labels(labels)} {value}")
+            for name in sorted({name for (name, _), _ in histograms}):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for (histogram_name, labels), histogram in histograms:
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+                    lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path=None):
+        """寫出 Prometheus 文字檔（先寫暫存檔再取代，避免讀到寫一半的內容）"""
+        path = path or self.prometheus_path
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(path + '.tmp', path)
+
+    def flush(self):
+        """執行中定期寫出 Prometheus 文字檔"""
+        if not self.prometheus_path:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._flushed < self.flush_interval:
+                return
+            self._flushed = now
+        self.write_prometheus()
+
+    def report(self):
+        """執行報告：計數器、量測值、各直方圖的次數/平均/分位數與 span"""
+        with self._lock:
+            counters = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                counters[name + _format_labels(labels)] = value
+            gauges = {name + _format_labels(labels): value for (name, labels), value in sorted(self.gauges.items())}
+            histograms = {}
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                histograms[name + _format_labels(labels)] = {
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'mean': histogram.sum / histogram.count if histogram.count else 0.0,
+                    'p50': histogram.quantile(0.50),
+                    'p95': histogram.quantile(0.95),
+                }
+            spans = list(self.spans)
+            dropped = self.dropped_spans
+        return {
+            'started': self.started,
+            'finished': time.time(),
+            'counters': counters,
+            'gauges': gauges,
+            'histograms': histograms,
+            'spans': spans,
+            'dropped_spans': dropped,
+        }
+
+    def write_report(self, path):
+        """寫出 JSON 執行報告"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+    def serve(self, port, host='127.0.0.1'):
+        """於背景執行緒提供 /metrics 端點（Prometheus 抓取用）"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                content = metrics.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        """停止 HTTP 端點"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class TimedRateLimiter:
+    """包裝限速器，將等待權杖的時間記入 rate_limit_wait_seconds
+
+    提供 breaker（CircuitBreaker）時，斷路器開啟期間所有請求先等待，等待時間記入 breaker_wait_seconds。
+    """
+    def __init__(self, limiter, metrics, breaker=None):
+        self.limiter = limiter
+        self.metrics = metrics
+        self.breaker = breaker
+
+    def acquire(self, url):
+        if self.breaker:
+            waited = self.breaker.wait()
+            if waited:
+                self.metrics.observe('breaker_wait_seconds', waited)
+        start = time.perf_counter()
+        self.limiter.acquire(url)
+        self.metrics.observe('rate_limit_wait_seconds', time.perf_counter() - start)
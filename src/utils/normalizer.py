@@ -0,0 +1,91 @@
+import re
+import pandas as pd
+
+# Company 屬性與輸出欄位的對應；金額單位為新台幣千元，毛利率單位為 %
+AMOUNT_FIELDS = {
+    'annual_revenue': '年營收',
+    'gross_profit': '毛利額',
+    'profit_before_tax': '稅前淨利',
+    'profit_after_tax': '稅後淨利',
+}
+MARGIN_FIELDS = {
+    'gross_margin': '毛利率',
+}
+
+_STRIP = re.compile(r'[,\s%]')
+_PARENS = re.compile(r'^\((.*)\)$')
+
+
+def _clean(series):
+    """去除千分位、空白與 %，括號負數轉為負號（向量化）"""
+    text = series.astype('string').str.replace(_STRIP, '', regex=True)
+    return text.str.replace(_PARENS, r'-\1', regex=True)
+
+
+def _to_number(series):
+    """轉為數值；已是數值型別的欄位（例如由 Parquet 讀回）不經過文字清理"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    return pd.to_numeric(_clean(series), errors='coerce')
+
+
+def to_amount(series):
+    """文字欄位轉為 Int64（可為空值）"""
+    return _to_number(series).round().astype('Int64')
+
+
+def to_margin(series):
+    """文字欄位轉為 Float64（可為空值）"""
+    return _to_number(series).astype('Float64')
+
+
+def normalize_frame(df):
+    """將結果 DataFrame 的金額與毛利率欄位轉為數值型別（回傳新的 DataFrame）"""
+    df = df.copy()
+    for column in AMOUNT_FIELDS.values():
+        if column in df:
+            df[column] = to_amount(df[column])
+    for column in MARGIN_FIELDS.values():
+        if column in df:
+            df[column] = to_margin(df[column])
+    return df
+
+
+def normalize_record(company):
+    """轉換單一公司資料列的數值欄位（爬取中逐筆使用，不建立 DataFrame）"""
+    for attr in AMOUNT_FIELDS:
+        setattr(company, attr, parse_amount(getattr(company, attr)))
+    for attr in MARGIN_FIELDS:
+        setattr(company, attr, parse_margin(getattr(company, attr)))
+    if company.metrics:
+        company.metrics = {key: parse_number(value) for key, value in company.metrics.items()}
+    return company
+
+
+def parse_amount(value):
+    """單一數值轉換（金額），無法轉換時回傳 None"""
+    return _parse_scalar(value, int)
+
+
+def parse_margin(value):
+    """單一數值轉換（毛利率），無法轉換時回傳 None"""
+    return _parse_scalar(value, float)
+
+
+def parse_number(value):
+    """單一數值轉換：整數文字回傳 int，含小數時回傳 float（如每股盈餘）"""
+    if isinstance(value, int) or (isinstance(value, str) and '.' not in value):
+        return parse_amount(value)
+    return parse_margin(value)
+
+
+def _parse_scalar(value, cast):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, (int, float)):
+        return cast(value)
+    text = _PARENS.sub(r'-\1', _STRIP.sub('', str(value)))
+    try:
+        return cast(round(float(text))) if cast is int else cast(float(text))
+    except ValueError:
+        return None
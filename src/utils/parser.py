@@ -2,19 +2,152 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from src.models.company import Company
-import time
+from src.utils.field_map import (
+    BALANCE_FIELD_MAP, CASH_FLOW_FIELD_MAP, INCOME_FIELD_MAP, FieldIndex, normalize_title
+)
+from src.utils.normalizer import AMOUNT_FIELDS, MARGIN_FIELDS
+from html.parser import HTMLParser
+from loguru import logger
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # 未安裝 lxml 時改用標準函式庫解析
+    lxml_html = None
+
+if lxml_html is not None:
+    # 預先編譯的 XPath，避免每頁重新解析運算式
+    _XP_STATEMENT_ROWS = etree.XPath(
+        "(//table[contains(concat(' ', normalize-space(@class), ' '), ' hasBorder ')])[1]//tr"
+    )
+    _XP_TD = etree.XPath("./td")
+    _XP_INFO_DIVS = etree.XPath("//div[contains(translate(@style, ' ', ''), 'font-weight:bold')]")
+    _XP_LABEL_ROWS = etree.XPath("//tr[th and td]")
+    _XP_ROW_CELLS = etree.XPath("./th|./td")
+    _XP_TEXT = etree.XPath("string(.)")
+
+
+class _TableExtractor(HTMLParser):
+    """從原始 HTML 擷取表格內容（不需瀏覽器）"""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tables = []
+        self.texts = []
+        self._table_stack = []
+        self._row = None
+        self._cell = None
+        self._div = None
+        self._div_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'table':
+            classes = (attrs.get('class') or '').split()
+            self._table_stack.append({'classes': classes, 'rows': []})
+        elif tag == 'tr' and self._table_stack:
+            self._row = []
+        elif tag in ('td', 'th') and self._row is not None:
+            self._cell = []
+        elif tag == 'div':
+            if self._div is not None:
+                self._div_depth += 1
+            elif 'font-weight:bold' in (attrs.get('style') or '').replace(' ', ''):
+                self._div = []
+                self._div_depth = 0
+
+    def handle_endtag(self, tag):
+        if tag in ('td', 'th') and self._cell is not None:
+            self._row.append(''.join(self._cell).strip())
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            self._table_stack[-1]['rows'].append(self._row)
+            self._row = None
+        elif tag == 'table' and self._table_stack:
+            self.tables.append(self._table_stack.pop())
+        elif tag == 'div' and self._div is not None:
+            if self._div_depth:
+                self._div_depth -= 1
+            else:
+                self.texts.append(''.join(self._div).strip())
+                self._div = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+        if self._div is not None:
+            self._div.append(data)
+
+
+def _extract_tables(html):
+    """解析 HTML 並回傳擷取器"""
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', errors='replace')
+    extractor = _TableExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor
+
+
+def _statement_rows(html, backend):
+    """取出第一個 hasBorder 表格各列的 td 文字，找不到表格時回傳 None"""
+    if backend == 'lxml':
+        rows = _XP_STATEMENT_ROWS(lxml_html.document_fromstring(html))
+        if not rows:
+            return None
+        return [[_XP_TEXT(td) for td in _XP_TD(row)] for row in rows]
+
+    extractor = _extract_tables(html)
+    for table in extractor.tables:
+        if 'hasBorder' in table['classes']:
+            return table['rows']
+    return None
+
+
+def _company_info_sources(html, backend):
+    """取出粗體 div 文字與「標題/數值」表格列"""
+    if backend == 'lxml':
+        doc = lxml_html.document_fromstring(html)
+        texts = [_XP_TEXT(div).strip() for div in _XP_INFO_DIVS(doc)]
+        rows = [[_XP_TEXT(cell).strip() for cell in _XP_ROW_CELLS(row)] for row in _XP_LABEL_ROWS(doc)]
+        return texts, rows
+
+    extractor = _extract_tables(html)
+    return extractor.texts, [row for table in extractor.tables for row in table['rows']]
 
 class DataParser:
     """資料解析工具類"""
+    # 原始 HTML 的解析後端：'lxml'（預設，需安裝 lxml）或 'stdlib'
+    BACKENDS = ('lxml', 'stdlib')
+    DEFAULT_BACKEND = 'lxml' if lxml_html is not None else 'stdlib'
+    # 報表類型：名稱 → (MOPS 端點, 欄位索引)；各報表共用同一種 hasBorder 表格解析
+    REPORTS = {
+        'income': ('ajax_t164sb04', FieldIndex(INCOME_FIELD_MAP)),
+        'balance': ('ajax_t164sb03', FieldIndex(BALANCE_FIELD_MAP)),
+        'cash_flow': ('ajax_t164sb05', FieldIndex(CASH_FLOW_FIELD_MAP)),
+    }
+
+    @staticmethod
+    def register_report(name, endpoint, field_map):
+        """註冊（或取代）一種報表：提交到 endpoint，以 field_map 取出欄位"""
+        DataParser.REPORTS[name] = (endpoint, FieldIndex(field_map))
+
+    @staticmethod
+    def set_field_map(field_map, report='income'):
+        """更換指定報表的欄位對應（格式見 field_map.INCOME_FIELD_MAP）"""
+        endpoint, _ = DataParser.REPORTS[report]
+        DataParser.register_report(report, endpoint, field_map)
+
+    @staticmethod
+    def report_endpoint(report):
+        """報表對應的 MOPS 端點"""
+        return DataParser.REPORTS[report][0]
+
     @staticmethod
     def parse_company_info(driver):
-        """解析公司基本資訊"""
+        """解析公司基本資訊（呼叫前須先等待搜尋結果載入）"""
         try:
             company_info = {}
             
-            # 等待頁面載入
-            time.sleep(2)
-            
             # 尋找包含公司資訊的 div 元素
             try:
                 # 使用 XPath 找到所有包含公司資訊的 div
@@ -30,60 +163,109 @@ class DataParser:
             except Exception as e:
                 print(f"解析公司資訊 div 時出錯: {str(e)}")
 
-            # 移除可能的空白字符
-            if '公司名稱' in company_info:
-                company_info['公司名稱'] = company_info['公司名稱'].strip()
-            if '公司代號' in company_info:
-                company_info['公司代號'] = company_info['公司代號'].strip()
-            if '產業類別' in company_info:
-                company_info['產業類別'] = company_info['產業類別'].strip()
+            return DataParser._finalize_company_info(company_info)
 
-            # 設置預設值
-            company_info.setdefault('公司名稱', '無資料')
-            company_info.setdefault('公司代號', '無資料')
-            company_info.setdefault('產業類別', '無資料')
+        except Exception as e:
+            print(f"解析公司資訊時出錯: {str(e)}")
+            return None
 
-            print(f"解析到的公司資訊: {company_info}")  # 調試輸出
-            return company_info
+    @staticmethod
+    def parse_company_info_html(html, backend=None):
+        """從原始 HTML 解析公司基本資訊（搜尋結果頁或公司基本資料頁）"""
+        try:
+            company_info = {}
+            texts, rows = _company_info_sources(html, backend or DataParser.DEFAULT_BACKEND)
+
+            # 搜尋結果頁：「公司名稱：XXX」格式的粗體 div
+            for text in texts:
+                for label in ('公司名稱', '公司代號', '產業類別'):
+                    if f"{label}：" in text:
+                        company_info[label] = text.replace(f"{label}：", "").strip()
+
+            # 公司基本資料頁：標題欄位後接數值欄位
+            for row in rows:
+                for i, cell in enumerate(row[:-1]):
+                    if cell in ('公司名稱', '公司代號', '產業類別'):
+                        company_info.setdefault(cell, row[i + 1])
+
+            return DataParser._finalize_company_info(company_info)
 
         except Exception as e:
             print(f"解析公司資訊時出錯: {str(e)}")
             return None
 
     @staticmethod
-    def parse_financial_data(table):
+    def _finalize_company_info(company_info):
+        """整理公司資訊並補上預設值"""
+        # 移除可能的空白字符
+        for key in ('公司名稱', '公司代號', '產業類別'):
+            if company_info.get(key):
+                company_info[key] = company_info[key].strip()
+            else:
+                company_info.pop(key, None)
+
+        # 設置預設值
+        company_info.setdefault('公司名稱', '無資料')
+        company_info.setdefault('公司代號', '無資料')
+        company_info.setdefault('產業類別', '無資料')
+
+        logger.debug(f"解析到的公司資訊: {company_info}")
+        return company_info
+
+    @staticmethod
+    def parse_financial_data(table, field_index=None, report='income'):
         """解析財務數據"""
         try:
-            company = Company()
-            data_found = False
-            
-            rows = table.find_elements(By.TAG_NAME, "tr")
-            for row in rows:
+            rows = []
+            for row in table.find_elements(By.TAG_NAME, "tr"):
                 try:
-                    cols = row.find_elements(By.TAG_NAME, "td")
-                    if len(cols) >= 2:
-                        title = cols[0].text.strip()
-                        value = cols[1].text.strip().replace(" ", "")  # 移除數字中的空格
-                        percentage = cols[2].text.strip() if len(cols) >= 3 else ""
-                        
-                        if "營業收入合計" in title:
-                            company.annual_revenue = value
-                            data_found = True
-                        elif "營業毛利（毛損）淨額" in title:
-                            company.gross_profit = value
-                            company.gross_margin = percentage
-                            data_found = True
-                        elif "稅前淨利（淨損）" in title:
-                            company.profit_before_tax = value
-                            data_found = True
-                        elif "本期淨利（淨損）" in title:
-                            company.profit_after_tax = value
-                            data_found = True
+                    rows.append([col.text for col in row.find_elements(By.TAG_NAME, "td")])
                 except Exception as e:
                     print(f"解析行數據時出錯: {str(e)}")
                     continue
-            
-            return company if data_found else None
+
+            return DataParser._build_financial_data(rows, field_index, report)
         except Exception as e:
             print(f"解析財務數據時出錯: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+
+    @staticmethod
+    def parse_financial_html(html, backend=None, field_index=None, report='income'):
+        """從原始 HTML 解析財務數據（取第一個 hasBorder 表格）"""
+        try:
+            rows = _statement_rows(html, backend or DataParser.DEFAULT_BACKEND)
+            if rows is None:
+                return None
+            return DataParser._build_financial_data(rows, field_index, report)
+        except Exception as e:
+            print(f"解析財務數據時出錯: {str(e)}")
+            return None
+
+    @staticmethod
+    def _build_financial_data(rows, field_index=None, report='income'):
+        """由各列儲存格文字組出財務數據
+
+        一次走訪表格，將每個科目存入 {正規化科目名稱: 各欄數值}，
+        再以該報表的欄位索引查出所需欄位（完整科目僅用於查詢，不保留在資料列上）。
+        """
+        line_items = {}
+        for cols in rows:
+            if len(cols) >= 2:
+                title = normalize_title(cols[0])
+                if title:
+                    # 移除數字中的空白；同名科目保留第一次出現者
+                    line_items.setdefault(title, [''.join(col.split()) for col in cols[1:]])
+
+        values = (field_index or DataParser.REPORTS[report][1]).extract(line_items)
+        if not values:
+            return None
+
+        company = Company()
+        metrics = {}
+        for field, value in values.items():
+            if field in AMOUNT_FIELDS or field in MARGIN_FIELDS:
+                setattr(company, field, value)
+            else:
+                metrics[field] = value
+        company.metrics = metrics or None
+        return company
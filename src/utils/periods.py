@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+import re
+
+# 各季財報法定公告期限（月, 日）；第四季為次年度
+FILING_DEADLINES = {
+    '01': (5, 15),
+    '02': (8, 14),
+    '03': (11, 14),
+    '04': (3, 31),
+}
+
+
+def filing_deadline(year, season):
+    """回傳民國 year 年第 season 季財報的公告期限（西元日期）"""
+    season = str(season).zfill(2)
+    month, day = FILING_DEADLINES[season]
+    ad_year = int(year) + 1911
+    if season == '04':
+        ad_year += 1
+    return date(ad_year, month, day)
+
+
+def period_end(year, season):
+    """回傳民國 year 年第 season 季的最後一天（西元日期），此日之後才可能有財報"""
+    season = int(season)
+    ad_year = int(year) + 1911
+    if season == 4:
+        return date(ad_year, 12, 31)
+    return date(ad_year, season * 3 + 1, 1) - timedelta(days=1)
+
+
+def is_closed_period(year, season, today=None):
+    """公告期限已過的期間視為已結束，內容不再變動"""
+    return (today or date.today()) > filing_deadline(year, season)
+
+
+def parse_period(text):
+    """解析期間字串（如 113Q4、113-04、11304），回傳 ('113', '04')"""
+    match = re.fullmatch(r'\s*(\d{2,3})\s*(?:[Qq]|-|/)?\s*0?([1-4])\s*', str(text))
+    if not match:
+        raise ValueError(f"無法解析的期間: {text}")
+    return match.group(1), match.group(2).zfill(2)
+
+
+def period_range(start, end):
+    """列出 start 到 end（含）之間的所有季度"""
+    year, season = int(start[0]), int(start[1])
+    end_year, end_season = int(end[0]), int(end[1])
+    periods = []
+    while (year, season) <= (end_year, end_season):
+        periods.append((str(year), str(season).zfill(2)))
+        season += 1
+        if season > 4:
+            year, season = year + 1, 1
+    return periods
+
+
+def parse_periods(spec):
+    """解析以逗號分隔的期間或區間（如 104Q1:113Q4,114Q1），依時間排序並去除重複"""
+    periods = set()
+    for part in str(spec).split(','):
+        if not part.strip():
+            continue
+        if ':' in part:
+            start, end = part.split(':', 1)
+            periods.update(period_range(parse_period(start), parse_period(end)))
+        else:
+            periods.add(parse_period(part))
+    return sorted(periods, key=lambda p: (int(p[0]), p[1]))
@@ -0,0 +1,98 @@
+from urllib.parse import urlsplit
+import multiprocessing
+import threading
+import time
+
+
+class TokenBucket:
+    """權杖桶限速器（執行緒安全）"""
+    def __init__(self, rate, capacity=None):
+        """rate: 每秒補充的權杖數；capacity: 可累積的最大權杖數（突發量）"""
+        if rate <= 0:
+            raise ValueError("rate 必須大於 0")
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """嘗試取得權杖，回傳還需等待的秒數（0 表示已取得）"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """阻塞直到取得權杖"""
+        while True:
+            delay = self.try_acquire(tokens)
+            if not delay:
+                return
+            time.sleep(delay)
+
+
+class HostRateLimiter:
+    """依主機分開計算的限速器"""
+    def __init__(self, rate, capacity=None):
+        """初始化限速設定"""
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        """取得指定主機的權杖桶"""
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.capacity)
+            return self._buckets[host]
+
+    def acquire(self, url):
+        """依網址的主機取得權杖"""
+        self.bucket(urlsplit(url).netloc).acquire()
+
+
+class SharedRateLimiter:
+    """跨程序共用的權杖桶（所有工作程序合計的請求頻率不超過 rate）
+
+    狀態存放在共享記憶體中，需在建立子程序前建立，並以參數傳給子程序。
+    MOPS 只有一個主機，因此不再依主機區分。
+    """
+    def __init__(self, rate, capacity=None, context=None):
+        """初始化共享狀態（context 須與建立子程序的 multiprocessing context 相同）"""
+        if rate <= 0:
+            raise ValueError("rate 必須大於 0")
+        context = context or multiprocessing.get_context()
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = context.Value('d', self.capacity, lock=False)
+        self._updated = context.Value('d', time.monotonic(), lock=False)
+        self._lock = context.Lock()
+
+    def try_acquire(self, tokens=1):
+        """嘗試取得權杖，回傳還需等待的秒數（0 表示已取得）"""
+        with self._lock:
+            now = time.monotonic()
+            available = min(self.capacity, self._tokens.value + (now - self._updated.value) * self.rate)
+            self._updated.value = now
+            if available >= tokens:
+                self._tokens.value = available - tokens
+                return 0
+            self._tokens.value = available
+            return (tokens - available) / self.rate
+
+    def acquire(self, url=None):
+        """阻塞直到取得權杖"""
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return
+            time.sleep(delay)
@@ -0,0 +1,65 @@
+from datetime import date
+from loguru import logger
+import time
+
+from src.utils.periods import is_closed_period, period_end
+from src.utils.retry import NO_DATA
+
+
+class IncrementalPlanner:
+    """增量更新：依紀錄檔中各公司各期的最後結果，只挑出需要抓取的 (公司, 期間)
+
+    - 已成功的期間不再抓取（財報公告後內容不變）
+    - 從未抓過、或上次因限流/網路等暫時性錯誤失敗的期間一定抓取
+    - 上次查無資料：公告期限前每隔 probe_interval 秒再查一次（公司陸續公告）；
+      期限過後已確認查無資料者，每隔 recheck_after 秒才再確認一次
+    - 季度尚未結束的期間不可能有財報，直接略過
+    """
+    def __init__(self, journal, probe_interval=12 * 3600, recheck_after=30 * 86400, now=None):
+        """初始化
+
+        journal: RunJournal（紀錄檔即為各公司最後一次看到的期間）
+        probe_interval: 公告期限前，查無資料的期間再次查詢的間隔（秒）
+        recheck_after: 公告期限後仍查無資料的期間再次確認的間隔（秒）
+        """
+        self.journal = journal
+        self.probe_interval = probe_interval
+        self.recheck_after = recheck_after
+        self.now = now
+
+    def needs_fetch(self, entry, year, season, now):
+        """單一期間是否需要抓取（entry 為紀錄檔中該期的最後一筆紀錄）"""
+        if entry is None:
+            return True
+        if entry['status'] == 'success':
+            return False
+        # 紀錄檔的 error 以錯誤類型開頭，查無資料以外的失敗都是暫時性錯誤
+        if not (entry.get('error') or '').startswith(NO_DATA):
+            return True
+        checked = date.fromtimestamp(entry['ts'])
+        if is_closed_period(year, season, checked):
+            return now - entry['ts'] >= self.recheck_after
+        return now - entry['ts'] >= self.probe_interval
+
+    def plan(self, companies, periods):
+        """依序產生需要抓取的任務，每個任務為 (公司, 待抓取期間)（companies 可為串流）"""
+        now = self.now or time.time()
+        today = date.fromtimestamp(now)
+        # 季度尚未結束的期間沒有財報可抓
+        periods = [p for p in periods if period_end(*p) < today]
+        entries = self.journal.load()
+        total = task_count = fetch_count = 0
+        for company in companies:
+            total += 1
+            todo = [
+                (year, season) for year, season in periods
+                if self.needs_fetch(entries.get(self.journal.key(company, year, season)), year, season, now)
+            ]
+            if todo:
+                task_count += 1
+                fetch_count += len(todo)
+                yield company, todo
+        logger.info(
+            f"增量模式：{task_count}/{total} 家公司需要更新（共 {fetch_count} 期），"
+            f"略過 {total - task_count} 家已是最新的公司"
+        )
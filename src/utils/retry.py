@@ -0,0 +1,208 @@
+from loguru import logger
+import random
+import threading
+import time
+
+import requests
+from selenium.common.exceptions import (
+    InvalidSessionIdException, NoSuchWindowException, TimeoutException, WebDriverException
+)
+
+# 錯誤分類：只有暫時性的錯誤會重試
+NO_DATA = 'no_data'        # 查無資料、代號不存在：重試也不會成功
+THROTTLED = 'throttled'    # 網站限流或阻擋：重試並觸發斷路器
+NETWORK = 'network'        # 連線逾時、連線中斷、5xx、頁面載入逾時
+DRIVER = 'driver'          # 瀏覽器當掉或連線中斷：需重新啟動瀏覽器後重試
+UNKNOWN = 'unknown'        # 其他錯誤（多半是程式或頁面結構問題）
+
+TRANSIENT = (THROTTLED, NETWORK, DRIVER)
+
+# 網站阻擋頻繁查詢時回應的頁面內容
+_BLOCKED_MARKERS = ('CAN NOT BE ACCESSED', 'TOO MANY REQUESTS')
+
+# 網站明確回應查無資料的頁面內容
+_NO_DATA_MARKERS = ('查詢無資料', '查無所需資料')
+
+# 瀏覽器已無法使用時的錯誤訊息片段
+_DRIVER_CRASH_MESSAGES = ('invalid session id', 'chrome not reachable', 'disconnected',
+                          'session deleted', 'no such window', 'target window already closed')
+
+
+class CrawlError(Exception):
+    """已分類的爬取錯誤"""
+    kind = UNKNOWN
+
+
+class NoDataError(CrawlError):
+    """查無資料或公司代號不存在"""
+    kind = NO_DATA
+
+
+class ThrottledError(CrawlError):
+    """網站限流或阻擋請求"""
+    kind = THROTTLED
+
+
+class NetworkError(CrawlError):
+    """頁面未載入完成或回應非預期的頁面（暫時性錯誤，可重試）"""
+    kind = NETWORK
+
+
+def is_blocked_page(html):
+    """是否為網站阻擋頻繁查詢的頁面"""
+    text = (html or '').upper()
+    return any(marker in text for marker in _BLOCKED_MARKERS)
+
+
+def is_no_data_page(html):
+    """是否為網站明確回應查無資料的頁面"""
+    return any(marker in (html or '') for marker in _NO_DATA_MARKERS)
+
+
+def classify(error):
+    """判斷錯誤類型，回傳 NO_DATA / THROTTLED / NETWORK / DRIVER / UNKNOWN"""
+    if isinstance(error, CrawlError):
+        return error.kind
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        if status == 429:
+            return THROTTLED
+        if status == 404:
+            return NO_DATA
+        return NETWORK if status is None or status >= 500 else UNKNOWN
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return NETWORK
+    if isinstance(error, TimeoutException):
+        return NETWORK
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException)):
+        return DRIVER
+    if isinstance(error, WebDriverException):
+        message = str(error).lower()
+        if any(text in message for text in _DRIVER_CRASH_MESSAGES):
+            return DRIVER
+        return NETWORK
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return NETWORK
+    return UNKNOWN
+
+
+class _LocalValue:
+    """與 multiprocessing.Value 相同介面的單程序版本"""
+    def __init__(self, value):
+        self.value = value
+
+
+class CircuitBreaker:
+    """斷路器：window 秒內遇到 threshold 次限流即暫停所有請求 cooldown 秒
+
+    連續觸發時暫停時間加倍（最多 max_cooldown 秒），成功後恢復。
+    提供 context 時狀態存放於共享記憶體，多個工作程序一起暫停（需在建立子程序前建立並以參數傳入）。
+    """
+    def __init__(self, threshold=3, window=60, cooldown=60, max_cooldown=600, context=None):
+        """初始化斷路器"""
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        if context is not None:
+            self._open_until = context.Value('d', 0.0, lock=False)
+            self._trips = context.Value('i', 0, lock=False)
+            self._lock = context.Lock()
+        else:
+            self._open_until = _LocalValue(0.0)
+            self._trips = _LocalValue(0)
+            self._lock = threading.Lock()
+        self._events = []
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_events'] = []
+        return state
+
+    @property
+    def is_open(self):
+        """目前是否暫停中"""
+        return time.time() < self._open_until.value
+
+    def record_throttle(self):
+        """記錄一次限流，達到門檻時開啟斷路器，回傳是否因此開啟"""
+        now = time.time()
+        with self._lock:
+            self._events = [t for t in self._events if now - t < self.window] + [now]
+            if len(self._events) < self.threshold or now < self._open_until.value:
+                return False
+            pause = min(self.max_cooldown, self.cooldown * 2 ** self._trips.value)
+            self._open_until.value = now + pause
+            self._trips.value += 1
+            self._events = []
+        logger.warning(f"網站限流，暫停所有請求 {pause:.0f} 秒")
+        return True
+
+    def record_success(self):
+        """請求成功，重置連續觸發次數"""
+        if self._trips.value and not self.is_open:
+            with self._lock:
+                self._trips.value = 0
+
+    def wait(self):
+        """斷路器開啟時等待至恢復，回傳等待秒數"""
+        waited = 0.0
+        while True:
+            remaining = self._open_until.value - time.time()
+            if remaining <= 0:
+                return waited
+            time.sleep(min(remaining, 1.0))
+            waited += min(remaining, 1.0)
+
+
+class RetryPolicy:
+    """統一的重試策略：依錯誤類型決定是否重試，等待時間為含隨機抖動的指數退避"""
+    def __init__(self, max_attempts=3, base_delay=2.0, max_delay=60.0, retry_on=TRANSIENT,
+                 breaker=None, metrics=None):
+        """初始化
+
+        max_attempts: 含第一次的總嘗試次數
+        base_delay/max_delay: 第 n 次重試前最多等待 min(max_delay, base_delay × 2^(n-1)) 秒（full jitter）
+        retry_on: 會重試的錯誤類型
+        breaker: CircuitBreaker，遇到限流時記錄，開啟期間所有嘗試都先等待
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = tuple(retry_on)
+        self.breaker = breaker
+        self.metrics = metrics
+
+    def backoff(self, attempt):
+        """第 attempt 次失敗後的等待秒數"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, func, on_retry=None, label=''):
+        """執行 func，暫時性錯誤時重試；最後一次仍失敗或錯誤不可重試時拋出原錯誤
+
+        on_retry(error, kind, attempt): 重試前呼叫，可用來重啟瀏覽器或重新載入頁面
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            if self.breaker:
+                self.breaker.wait()
+            try:
+                result = func()
+            except Exception as e:
+                kind = classify(e)
+                if self.metrics:
+                    self.metrics.inc('errors_total', kind=kind)
+                if kind == THROTTLED and self.breaker and self.breaker.record_throttle() and self.metrics:
+                    self.metrics.inc('breaker_trips_total')
+                if kind not in self.retry_on or attempt == self.max_attempts:
+                    raise
+                delay = self.backoff(attempt)
+                if self.metrics:
+                    self.metrics.inc('retries_total', kind=kind)
+                logger.warning(f"{label}發生{kind}錯誤: {str(e)}，{delay:.1f} 秒後重試（第 {attempt} 次）")
+                if on_retry:
+                    on_retry(e, kind, attempt)
+                time.sleep(delay)
+            else:
+                if self.breaker:
+                    self.breaker.record_success()
+                return result
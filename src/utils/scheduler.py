@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+import asyncio
+
+
+class AsyncCrawlScheduler:
+    """以 asyncio 同時處理多家公司的排程器
+
+    worker 為同步函式（例如 MOPSCrawler._crawl_company），每個消費者在自己的執行緒中執行；
+    佇列有上限，結果依輸入順序回傳，逾時或失敗的項目以 None 表示。
+    逾時的執行緒無法中斷，消費者改用新的執行緒繼續處理，不再等待也不佔用名額。
+    """
+    def __init__(self, worker, concurrency=4, queue_size=None, task_timeout=120, on_timeout=None):
+        """初始化排程器
+
+        on_timeout: 項目逾時時以該項目呼叫（例如記錄失敗、阻止逾時執行緒事後寫出結果）
+        """
+        self.worker = worker
+        self.concurrency = max(1, concurrency)
+        self.queue_size = queue_size or self.concurrency * 2
+        self.task_timeout = task_timeout
+        self.on_timeout = on_timeout
+
+    def run(self, items):
+        """執行所有項目並依原始順序回傳結果"""
+        return asyncio.run(self._run(items))
+
+    async def _run(self, items):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        results = {}
+
+        async def producer():
+            for index, item in enumerate(items):
+                await queue.put((index, item))
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def consumer():
+            executor = ThreadPoolExecutor(max_workers=1)
+            try:
+                while True:
+                    entry = await queue.get()
+                    if entry is None:
+                        return
+                    index, item = entry
+                    try:
+                        results[index] = await asyncio.wait_for(
+                            loop.run_in_executor(executor, self.worker, item),
+                            timeout=self.task_timeout
+                        )
+                    except asyncio.TimeoutError:
+                        logger.error(f"處理 {item} 逾時（超過 {self.task_timeout} 秒）")
+                        results[index] = None
+                        # 逾時的執行緒仍在執行：放棄該執行緒，後續項目改用新的執行緒
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        executor = ThreadPoolExecutor(max_workers=1)
+                        if self.on_timeout:
+                            self.on_timeout(item)
+                    except Exception as e:
+                        logger.error(f"處理 {item} 時出錯: {str(e)}")
+                        results[index] = None
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        await asyncio.gather(producer(), *(consumer() for _ in range(self.concurrency)))
+        return [results[index] for index in sorted(results)]
@@ -0,0 +1,193 @@
+from loguru import logger
+import csv
+import glob
+import os
+import threading
+import time
+import uuid
+
+from src.utils.field_map import DECIMAL_FIELDS
+from src.utils.normalizer import AMOUNT_FIELDS, MARGIN_FIELDS, parse_amount, parse_margin
+from src.utils.parser import DataParser
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # 未安裝 pyarrow 時無法使用 ParquetSink
+    pa = None
+
+# 欄位型別：金額為 int64（千元），百分比與每股盈餘為 float64
+TEXT_COLUMNS = ['公司名稱', '公司代號', '產業類別', '年度', '季別']
+COLUMNS = ['公司名稱', '公司代號', '產業類別', '年度', '季別', '年營收',
+           '毛利額', '毛利率', '稅前淨利', '稅後淨利']
+
+
+def column_types(reports=None):
+    """依登記的報表欄位對應（DataParser.REPORTS）列出輸出欄位與型別 {欄名: 'string' | 'int64' | 'float64'}
+
+    固定欄位在前，各報表的額外指標依登記順序接在後面；預設包含所有已登記的報表，
+    不同執行（抓取的報表不同）寫出的檔案欄位一致。
+    """
+    types = {
+        column: 'string' if column in TEXT_COLUMNS
+        else 'float64' if column in MARGIN_FIELDS.values() else 'int64'
+        for column in COLUMNS
+    }
+    for report in reports or DataParser.REPORTS:
+        for field, (_, column) in DataParser.REPORTS[report][1].field_map.items():
+            label = AMOUNT_FIELDS.get(field) or MARGIN_FIELDS.get(field) or field
+            types.setdefault(label, 'float64' if column == 'percent' or field in DECIMAL_FIELDS else 'int64')
+    return types
+
+
+def typed_row(company, types):
+    """將公司資料轉為帶型別的資料列（已正規化的數值直接沿用）"""
+    row = company.to_dict()
+    for column, kind in types.items():
+        if kind == 'int64':
+            row[column] = parse_amount(row.get(column))
+        elif kind == 'float64':
+            row[column] = parse_margin(row.get(column))
+    return row
+
+
+class ResultSink:
+    """結果輸出介面：爬蟲每完成一家公司即呼叫 write"""
+    def write(self, companies):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CsvSink(ResultSink):
+    """逐筆附加寫入 CSV（utf-8-sig，可直接以 Excel 開啟）
+
+    欄位為固定欄位加上所有登記報表的指標（column_types）。
+    append=True（續跑、增量更新）時接在既有檔案之後，否則取代既有檔案。
+    """
+    def __init__(self, path='data/output/results.csv', append=False, reports=None):
+        """開啟輸出檔並寫入標題列（附加到既有檔案時沿用其標題列）"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.types = column_types(reports)
+        self._lock = threading.Lock()
+        fieldnames = None
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                fieldnames = next(csv.reader(f), None)
+        self._file = open(path, 'a' if fieldnames else 'w', newline='', encoding='utf-8-sig')
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames or list(self.types),
+                                      extrasaction='ignore')
+        if not fieldnames:
+            self._writer.writeheader()
+
+    def write(self, companies):
+        with self._lock:
+            self._writer.writerows(typed_row(company, self.types) for company in companies)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+                logger.success(f"結果已保存至: {self.path}")
+
+
+class ParquetSink(ResultSink):
+    """依年度/季別分區的 Parquet 輸出
+
+    目錄結構為 root/year=113/season=04/part-*.parquet（分區欄位不重複存於檔案內），
+    可用 ParquetSink.read(root) 讀回。所有分區合計緩衝達 max_buffered_rows 筆、
+    或距上次寫出超過 flush_interval 秒時，各分區的緩衝寫出為完整的檔案，
+    記憶體用量有上限，程式中斷時已寫出的檔案仍可讀取。
+    append=True（續跑、增量更新）時保留既有的檔案，否則開始時清除先前的輸出。
+    """
+    def __init__(self, root='data/output/parquet', row_group_size=10000, max_buffered_rows=20000,
+                 flush_interval=300, append=False, reports=None):
+        """初始化輸出目錄"""
+        if pa is None:
+            raise ImportError("ParquetSink 需要安裝 pyarrow")
+        self.root = root
+        self.row_group_size = row_group_size
+        self.max_buffered_rows = max_buffered_rows
+        self.flush_interval = flush_interval
+        if not append:
+            for path in glob.glob(os.path.join(root, 'year=*', 'season=*', 'part-*.parquet')):
+                os.remove(path)
+        # 欄位與型別由登記的報表欄位對應決定；年度/季別為分區欄位，不存於檔案內
+        self.types = column_types(reports)
+        self.schema = pa.schema([
+            (column, getattr(pa, kind)()) for column, kind in self.types.items()
+            if column not in ('年度', '季別')
+        ])
+        self._part = f"part-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self._files = 0
+        self._buffers = {}
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def write(self, companies):
+        with self._lock:
+            for company in companies:
+                row = typed_row(company, self.types)
+                partition = (str(row.pop('年度') or ''), str(row.pop('季別') or ''))
+                self._buffers.setdefault(partition, []).append(row)
+                self._buffered += 1
+            if (self._buffered >= self.max_buffered_rows
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_all()
+
+    def _flush_all(self):
+        """將所有分區的緩衝各寫出為一個檔案"""
+        for partition in list(self._buffers):
+            self._flush(partition)
+        self._last_flush = time.monotonic()
+
+    def _flush(self, partition):
+        """將分區緩衝寫出為一個完整的 Parquet 檔（每 row_group_size 筆一個 row group）"""
+        rows = self._buffers.pop(partition, None)
+        if not rows:
+            return
+        self._buffered -= len(rows)
+        year, season = partition
+        directory = os.path.join(self.root, f"year={year}", f"season={season}")
+        os.makedirs(directory, exist_ok=True)
+        self._files += 1
+        pq.write_table(pa.Table.from_pylist(rows, schema=self.schema),
+                       os.path.join(directory, f"{self._part}-{self._files:05d}.parquet"),
+                       row_group_size=self.row_group_size)
+
+    def close(self):
+        with self._lock:
+            self._flush_all()
+            if self._files:
+                logger.success(f"結果已保存至: {self.root}")
+
+    @staticmethod
+    def read(root='data/output/parquet', columns=None):
+        """讀回分區資料集為 Arrow Table，並還原年度/季別欄位"""
+        if pa is None:
+            raise ImportError("讀取 Parquet 需要安裝 pyarrow")
+        partitioning = ds.partitioning(
+            pa.schema([('year', pa.string()), ('season', pa.string())]), flavor='hive'
+        )
+        table = ds.dataset(root, format='parquet', partitioning=partitioning).to_table(columns=columns)
+        names = ['年度' if n == 'year' else '季別' if n == 'season' else n for n in table.column_names]
+        return table.rename_columns(names)
+
+
+class MultiSink(ResultSink):
+    """同時寫入多個輸出"""
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    def write(self, companies):
+        for sink in self.sinks:
+            sink.write(companies)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
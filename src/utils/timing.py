@@ -0,0 +1,78 @@
+from contextlib import contextmanager, nullcontext
+from loguru import logger
+import math
+import threading
+import time
+
+
+def percentile(values, q):
+    """已排序數值的分位數（nearest-rank：第 ceil(q × n) 小的值），樣本少時不會偏低
+
+    >>> percentile([1, 2, 3, 4], 0.95)
+    4
+    >>> percentile([1, 2, 3, 4], 0.50)
+    2
+    >>> percentile([5], 0.95)
+    5
+    >>> percentile(list(range(1, 21)), 0.95)
+    19
+    """
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+class LatencyTracker:
+    """記錄各階段耗時，並於執行結束時彙總"""
+    def __init__(self, metrics=None):
+        """初始化計時資料（提供 CrawlMetrics 時，各階段同時記入直方圖與追蹤 span）"""
+        self.samples = {}
+        self.metrics = metrics
+        self._lock = threading.Lock()
+
+    def record(self, phase, seconds):
+        """記錄一次耗時（秒）"""
+        with self._lock:
+            self.samples.setdefault(phase, []).append(seconds)
+        if self.metrics:
+            self.metrics.observe('phase_seconds', seconds, phase=phase)
+
+    @contextmanager
+    def phase(self, name):
+        """以 with 語法量測一個階段"""
+        with self.metrics.span(name) if self.metrics else nullcontext():
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.record(name, time.perf_counter() - start)
+
+    def summary(self):
+        """回傳 {階段: 統計資料}，時間單位為秒"""
+        with self._lock:
+            samples = {phase: sorted(values) for phase, values in self.samples.items()}
+        summary = {}
+        for phase, values in samples.items():
+            count = len(values)
+            summary[phase] = {
+                'count': count,
+                'total': sum(values),
+                'mean': sum(values) / count,
+                'p50': percentile(values, 0.50),
+                'p95': percentile(values, 0.95),
+                'max': values[-1],
+            }
+        return summary
+
+    def log_summary(self):
+        """輸出各階段耗時彙總"""
+        summary = self.summary()
+        if not summary:
+            return
+        grand_total = sum(stats['total'] for stats in summary.values()) or 1
+        lines = [f"{'階段':<16}{'次數':>6}{'總計(s)':>10}{'平均(ms)':>10}{'p95(ms)':>10}{'佔比':>8}"]
+        for phase, stats in sorted(summary.items(), key=lambda item: -item[1]['total']):
+            lines.append(
+                f"{phase:<16}{stats['count']:>6}{stats['total']:>10.2f}"
+                f"{stats['mean'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}"
+                f"{stats['total'] / grand_total:>8.1%}"
+            )
+        logger.info("各階段耗時彙總：\n" + "\n".join(lines))